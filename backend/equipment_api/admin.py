@@ -1,10 +1,10 @@
 from django.contrib import admin
-from .models import Dataset, EquipmentRecord
+from .models import Dataset, EquipmentRecord, Job, UploadSession, WorkerHeartbeat
 
 
 @admin.register(Dataset)
 class DatasetAdmin(admin.ModelAdmin):
-    list_display = ['id', 'filename', 'user', 'uploaded_at']
+    list_display = ['id', 'filename', 'user', 'uploaded_at', 'row_count', 'records_written']
     list_filter = ['uploaded_at', 'user']
     search_fields = ['filename', 'user__username']
 
@@ -14,3 +14,20 @@ class EquipmentRecordAdmin(admin.ModelAdmin):
     list_display = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature', 'dataset']
     list_filter = ['equipment_type', 'dataset']
     search_fields = ['equipment_name', 'equipment_type']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'dataset', 'upload', 'status', 'worker', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+
+
+@admin.register(WorkerHeartbeat)
+class WorkerHeartbeatAdmin(admin.ModelAdmin):
+    list_display = ['name', 'dedicated', 'last_seen']
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'filename', 'user', 'offset', 'size', 'status', 'updated_at']
+    list_filter = ['status']
@@ -0,0 +1,89 @@
+"""
+Server-side cache for serialized dataset responses.
+
+Response data is cached under keys scoped either to one dataset or to the
+dataset listing. Each scope has a generation token stored next to the
+entries; invalidating a scope drops its token, so every entry built under
+the old one becomes unreachable at once, whatever query variants were
+cached. Hit and miss counts per response kind live in the same cache.
+Responses larger than ``RESPONSE_CACHE_MAX_BYTES`` pickled are not stored,
+so a few big payloads can't fill the memory of every worker.
+"""
+import pickle
+import uuid
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+
+from .conditional import representation
+
+PREFIX = 'equipment'
+KINDS = ('detail', 'summary', 'chart', 'bundle', 'list')
+LIST_SCOPE = 'list'
+
+
+def dataset_scope(dataset_id):
+    return f'dataset:{dataset_id}'
+
+
+def generation(scope):
+    """Current generation token of ``scope``, started on first use"""
+    key = f'{PREFIX}:gen:{scope}'
+    token = cache.get(key)
+    if token is None:
+        token = uuid.uuid4().hex
+        if not cache.add(key, token, None):
+            token = cache.get(key, token)
+    return token
+
+
+def invalidate(scope):
+    cache.delete(f'{PREFIX}:gen:{scope}')
+
+
+def invalidate_dataset(dataset_id):
+    """Forget cached responses for a dataset and the listing it appears in"""
+    invalidate(dataset_scope(dataset_id))
+    invalidate(LIST_SCOPE)
+
+
+def record(counter, kind):
+    key = f'{PREFIX}:stats:{counter}:{kind}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.add(key, 1, None)
+
+
+def cached_data(scope, kind, request, compute, version=0):
+    """Response data for ``request`` from the cache, or ``compute()`` and store it.
+
+    Returns ``(data, hit)``.
+    """
+    key = f'{PREFIX}:{scope}:{generation(scope)}:{representation(request, kind, version)}'
+    data = cache.get(key)
+    if data is not None:
+        record('hits', kind)
+        return data, True
+    record('misses', kind)
+    data = compute()
+    if len(pickle.dumps(data, pickle.HIGHEST_PROTOCOL)) <= settings.RESPONSE_CACHE_MAX_BYTES:
+        cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+    return data, False
+
+
+def stats():
+    """Hit/miss counters per response kind, with the hit ratio"""
+    backend = type(caches[DEFAULT_CACHE_ALIAS])
+    result = {'backend': f'{backend.__module__}.{backend.__name__}'}
+    for kind in KINDS:
+        hits = cache.get(f'{PREFIX}:stats:hits:{kind}', 0)
+        misses = cache.get(f'{PREFIX}:stats:misses:{kind}', 0)
+        result[kind] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else None,
+        }
+    return result
@@ -0,0 +1,156 @@
+"""
+Chart-ready series for dataset columns.
+
+Plotting a large dataset point by point means shipping and drawing every
+row; these reduce the stored columns to a payload whose size depends only
+on the requested resolution:
+
+- histograms: the fixed-bin histograms precomputed in the stored summary
+  (recomputed only when another bin count is asked for),
+- density: a 2-D histogram of two columns, for scatter-style views,
+- series: each column against its row index, downsampled to a point
+  budget with LTTB (Largest-Triangle-Three-Buckets) or per-bucket min/max.
+
+Everything is computed with NumPy over the column arrays. LTTB picks
+buckets in order, since each choice depends on the previous one, but the
+work inside a bucket is vectorized.
+"""
+import numpy as np
+
+from .columnar import NUMERIC_COLUMNS
+from .summary import HISTOGRAM_BINS, as_float_array, histogram
+
+# Bump when the shape or definition of the chart data changes
+CHART_VERSION = 1
+
+DOWNSAMPLERS = ('lttb', 'minmax')
+DEFAULT_POINTS = 1000
+MAX_POINTS = 10000
+DEFAULT_GRID_BINS = 32
+MAX_BINS = 256
+DEFAULT_DENSITY = ('Pressure', 'Temperature')
+
+
+def lttb(x, y, points):
+    """Indices of ``points`` samples of ``(x, y)`` chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last samples are always kept; every bucket in between
+    contributes the sample forming the largest triangle with the previous
+    pick and the average of the next bucket.
+    """
+    n = x.size
+    if points >= n or points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.intp)
+    selected = np.empty(points, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < edges.size:
+            following = slice(stop, edges[bucket + 2])
+            next_x, next_y = x[following].mean(), y[following].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _first_matches(values, targets, bucket):
+    """Index of the first value equal to its bucket's target, per bucket"""
+    hits = np.flatnonzero(values == targets[bucket])
+    _, first = np.unique(bucket[hits], return_index=True)
+    return hits[first]
+
+
+def minmax(y, points):
+    """Sorted indices of the minimum and maximum of ``points // 2`` equal-width buckets of ``y``"""
+    n = y.size
+    if points >= n:
+        return np.arange(n)
+    buckets = max(points // 2, 1)
+    starts = np.linspace(0, n, buckets + 1).astype(np.intp)
+    bucket = np.repeat(np.arange(buckets), np.diff(starts))
+    lows = _first_matches(y, np.minimum.reduceat(y, starts[:-1]), bucket)
+    highs = _first_matches(y, np.maximum.reduceat(y, starts[:-1]), bucket)
+    return np.unique(np.concatenate((lows, highs)))
+
+
+def downsample(values, points, method='lttb'):
+    """``{'x': row indices, 'y': values}`` of at most ``points`` samples; missing values are skipped"""
+    values = as_float_array(values)
+    index = np.flatnonzero(~np.isnan(values))
+    present = values[index]
+    if method == 'minmax':
+        selected = minmax(present, points)
+    else:
+        selected = lttb(index.astype(np.float64), present, points)
+    return {'x': index[selected].tolist(), 'y': present[selected].tolist()}
+
+
+def _bounds(values):
+    low, high = float(values.min()), float(values.max())
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return low, high
+
+
+def density(x, y, bins=DEFAULT_GRID_BINS):
+    """2-D histogram of rows where both ``x`` and ``y`` are present.
+
+    ``counts[i][j]`` is the number of rows in x bin ``i`` and y bin ``j``.
+    """
+    x, y = as_float_array(x), as_float_array(y)
+    present = ~(np.isnan(x) | np.isnan(y))
+    if not present.any():
+        return {'x_edges': [], 'y_edges': [], 'counts': []}
+    x, y = x[present], y[present]
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins, range=(_bounds(x), _bounds(y)))
+    return {
+        'x_edges': x_edges.tolist(),
+        'y_edges': y_edges.tolist(),
+        'counts': counts.astype(np.int64).tolist(),
+    }
+
+
+def column_histogram(values, bins):
+    values = as_float_array(values)
+    present = np.sort(values[~np.isnan(values)])
+    if not present.size:
+        return {'edges': [], 'counts': []}
+    counts, edges = histogram(present, bins)
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+
+def chart_data(dataset, points=DEFAULT_POINTS, bins=HISTOGRAM_BINS, grid_bins=DEFAULT_GRID_BINS,
+               density_columns=DEFAULT_DENSITY, method='lttb'):
+    """Histograms, density grid and downsampled series for ``dataset``.
+
+    Keys of ``histograms`` and ``series`` are the lowercase column names
+    used by the summary statistics.
+    """
+    columns = dataset.get_columns()
+    statistics = (dataset.get_summary() or {}).get('statistics', {}) if bins == HISTOGRAM_BINS else {}
+
+    histograms = {}
+    series = {}
+    for name in NUMERIC_COLUMNS:
+        key = name.lower()
+        stored = statistics.get(key, {}).get('histogram')
+        histograms[key] = stored if stored is not None else column_histogram(columns.numeric[name], bins)
+        series[key] = downsample(columns.numeric[name], points, method)
+
+    x_name, y_name = density_columns
+    grid = density(columns.numeric[x_name], columns.numeric[y_name], grid_bins)
+    return {
+        'row_count': len(columns),
+        'histograms': histograms,
+        'density': {'x': x_name.lower(), 'y': y_name.lower(), **grid},
+        'series': series,
+        'downsample': {'method': method, 'points': points},
+    }
@@ -0,0 +1,181 @@
+"""
+Columnar encoding for dataset rows.
+
+Numeric columns are packed float64 arrays (missing values are NaN), the
+``Type`` column is dictionary-encoded as a label list plus an int32 code
+array, and ``Equipment Name`` is a length-prefixed UTF-8 string column.
+All arrays are serialized little-endian so blobs are portable between
+hosts, and are decoded as zero-copy NumPy views.
+
+Only the parsed value of a numeric cell is stored, not its text, so rows
+read back from columns spell numbers canonically (see ``format_number``).
+"""
+from array import array
+import math
+import sys
+
+import numpy as np
+
+
+NAME_COLUMN = 'Equipment Name'
+TYPE_COLUMN = 'Type'
+NUMERIC_COLUMNS = ('Flowrate', 'Pressure', 'Temperature')
+SCHEMA = (NAME_COLUMN, TYPE_COLUMN) + NUMERIC_COLUMNS
+_SCHEMA_SET = frozenset(SCHEMA)
+
+_SWAP = sys.byteorder != 'little'
+
+
+def is_columnar_schema(fieldnames):
+    """True if a CSV header can be stored columnar without losing columns"""
+    return (
+        fieldnames is not None
+        and len(fieldnames) == len(SCHEMA)
+        and _SCHEMA_SET.issuperset(fieldnames)
+    )
+
+
+def pack_array(values):
+    if _SWAP:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+_DTYPES = {'d': '<f8', 'i': '<i4', 'I': '<u4'}
+
+
+def unpack_array(typecode, blob):
+    """Read-only NumPy view over a packed little-endian blob"""
+    return np.frombuffer(bytes(blob), dtype=_DTYPES[typecode])
+
+
+def pack_strings(strings):
+    """Encode a list of strings as ``uint32 offsets + utf-8 payload``"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = array('I', [0])
+    total = 0
+    for item in encoded:
+        total += len(item)
+        offsets.append(total)
+    return pack_array(array('I', [len(encoded)])) + pack_array(offsets) + b''.join(encoded)
+
+
+def string_buffers(blob):
+    """Zero-copy ``(offsets, utf-8 payload)`` NumPy views of a ``pack_strings`` blob"""
+    blob = bytes(blob)
+    count = int(unpack_array('I', blob[:4])[0])
+    header = 4 + (count + 1) * 4
+    return unpack_array('I', blob[4:header]), np.frombuffer(blob, dtype=np.uint8, offset=header)
+
+
+def unpack_strings(blob):
+    offsets, payload = string_buffers(blob)
+    offsets = offsets.tolist()
+    payload = payload.tobytes()
+    return [
+        payload[offsets[i]:offsets[i + 1]].decode('utf-8')
+        for i in range(len(offsets) - 1)
+    ]
+
+
+def format_number(value):
+    """Render a stored float as the text of a CSV cell.
+
+    Integral values are written without a decimal point and others as the
+    shortest text that parses back to the same float. The source spelling
+    is not kept: ``5.20`` comes back as ``5.2``, ``007`` as ``7``, ``1e3``
+    as ``1000`` and ``-0`` as ``0``. Missing values are empty strings.
+    """
+    if math.isnan(value):
+        return ''
+    value = float(value)  # NumPy scalars repr() as e.g. np.float64(5.2)
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def parse_number(value, strict=True):
+    """Parse a CSV cell into a float; empty cells become NaN.
+
+    With ``strict=False`` unparsable values also become NaN instead of
+    raising ``ValueError``.
+    """
+    if not value:
+        return math.nan
+    try:
+        return float(value)
+    except ValueError:
+        if strict:
+            raise
+        return math.nan
+
+
+class Columns:
+    """Typed, column-oriented view of a dataset's rows"""
+
+    def __init__(self, names, type_labels, type_codes, numeric):
+        self.names = names
+        self.type_labels = type_labels
+        self.type_codes = type_codes
+        self.numeric = numeric
+
+    def __len__(self):
+        return len(self.names)
+
+    def types(self):
+        labels = self.type_labels
+        return (labels[code] for code in self.type_codes)
+
+    def row(self, index):
+        """Row ``index`` in the JSON format of ``Dataset.data``"""
+        row = {
+            NAME_COLUMN: self.names[index],
+            TYPE_COLUMN: self.type_labels[self.type_codes[index]],
+        }
+        for name in NUMERIC_COLUMNS:
+            row[name] = format_number(self.numeric[name][index])
+        return row
+
+    def iter_rows(self, start=0, stop=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        for index in range(start, stop):
+            yield self.row(index)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], array('i'), {name: array('d') for name in NUMERIC_COLUMNS})
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build columns from legacy list-of-dict rows"""
+        writer = ColumnarWriter(strict=False)
+        for row in rows:
+            writer.write(row)
+        return writer.columns
+
+
+class ColumnarWriter:
+    """Storage writer that appends parsed CSV rows to typed columns"""
+
+    def __init__(self, strict=True):
+        self.strict = strict
+        self.columns = Columns.empty()
+        self._codes = {}
+
+    def write(self, row):
+        columns = self.columns
+        columns.names.append(row.get(NAME_COLUMN) or '')
+        label = row.get(TYPE_COLUMN, 'Unknown')
+        if label is None:
+            label = ''
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(columns.type_labels)
+            columns.type_labels.append(label)
+        columns.type_codes.append(code)
+        for name in NUMERIC_COLUMNS:
+            columns.numeric[name].append(parse_number(row.get(name), self.strict))
+
+    def store(self, dataset):
+        dataset.set_columns(self.columns)
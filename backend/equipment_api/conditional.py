@@ -0,0 +1,73 @@
+"""
+HTTP validators (``ETag`` / ``Last-Modified``) for dataset responses.
+
+Datasets never change after upload, so a response is fully determined by
+the dataset's content hash, which representation was asked for (action,
+query string, renderer) and the version of whatever derives it from the
+rows. Those go into a strong ETag, which only needs the dataset's id,
+``uploaded_at`` and ``content_hash`` to build, so ``If-None-Match`` can be
+answered with ``304 Not Modified`` before any rows or summaries are loaded.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+# Fields needed to build validators; load only these for the precondition check
+VALIDATOR_FIELDS = ('id', 'uploaded_at', 'content_hash')
+
+CHART_PARAMS = ('points', 'downsample', 'bins', 'grid', 'density')
+# Query parameters each kind of response depends on. Any others (cache
+# busters, tracking tags) are left out of the representation, so they
+# neither split the response cache nor change the ETag.
+QUERY_PARAMS = {
+    'detail': ('fields', 'exclude'),
+    'list': ('fields', 'exclude'),
+    'summary': (),
+    'chart': CHART_PARAMS,
+    'bundle': CHART_PARAMS + ('limit',),
+    'pdf': ('mode',),
+}
+
+
+def representation(request, kind, version=0):
+    """Short hash identifying the ``kind`` response asked for by ``request``.
+
+    Covers the query parameters in ``QUERY_PARAMS[kind]`` and the
+    negotiated renderer; ``version`` should change whenever the code
+    producing the response does (e.g. ``Dataset.SUMMARY_VERSION``).
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    params = sorted((name, values) for name, values in request.GET.lists() if name in QUERY_PARAMS[kind])
+    variant = '|'.join([
+        kind,
+        str(version),
+        getattr(renderer, 'format', '') or '',
+        urlencode(params, doseq=True),
+    ])
+    return hashlib.sha256(variant.encode()).hexdigest()[:16]
+
+
+def dataset_validators(dataset, request, kind, version=0):
+    """``(etag, last_modified)`` for the ``kind`` representation of ``dataset``"""
+    variant = representation(request, kind, version)
+    etag = f'"{dataset.id}-{dataset.get_content_hash()[:32]}-{variant}"'
+    return etag, int(dataset.uploaded_at.timestamp())
+
+
+def not_modified(request, etag, last_modified):
+    """A ``304`` (or ``412``) response if the request's preconditions say so, else None"""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    """Attach validators; clients may store the response but must revalidate it"""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Accept'])
+    return response
@@ -0,0 +1,172 @@
+"""
+Export of dataset rows as CSV, NDJSON or NumPy ``.npz``.
+
+CSV and NDJSON are streamed: rows are encoded in blocks of
+``EXPORT_BATCH`` straight from the stored columns (or legacy JSON rows),
+so the first bytes go out immediately and only one encoded block is held
+at a time, however large the dataset.
+
+``.npz`` carries the typed columns themselves: float64 arrays for the
+numeric columns, int32 codes plus a label array for ``Type``, and UTF-8
+bytes plus uint32 offsets for ``Equipment Name``. Clients load it with
+``np.load`` and no per-cell parsing; ``read_npz`` is the reference decoder.
+"""
+import csv
+import io
+import json
+import math
+import zlib
+
+from rest_framework.renderers import BaseRenderer
+
+import numpy as np
+
+from .columnar import NUMERIC_COLUMNS, SCHEMA, Columns, format_number, pack_strings, string_buffers
+
+EXPORT_BATCH = 8192
+
+
+class StreamRenderer(BaseRenderer):
+    """Lets ``?format=`` select an export format.
+
+    Export responses are streamed by the view, and errors are rendered by
+    ``JSONRenderer`` (see ``DatasetViewSet.finalize_response``), so this
+    renders nothing the client normally sees.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode() if data is not None else b''
+
+
+class CSVRenderer(StreamRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(StreamRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class NPZRenderer(StreamRenderer):
+    media_type = 'application/x-npz'
+    format = 'npz'
+
+
+def _batches(count):
+    for start in range(0, count, EXPORT_BATCH):
+        yield start, min(start + EXPORT_BATCH, count)
+
+
+def _fieldnames(rows):
+    """Column names of legacy JSON rows, in order of first appearance"""
+    names = {}
+    for row in rows:
+        names.update(dict.fromkeys(row))
+    return list(names)
+
+
+def iter_csv(dataset):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+
+    def flush():
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    if dataset.is_columnar:
+        columns = dataset.get_columns()
+        labels = columns.type_labels
+        writer.writerow(SCHEMA)
+        yield flush()
+        for start, stop in _batches(len(columns)):
+            numeric = [
+                [format_number(value) for value in columns.numeric[name][start:stop].tolist()]
+                for name in NUMERIC_COLUMNS
+            ]
+            types = [labels[code] for code in columns.type_codes[start:stop].tolist()]
+            writer.writerows(zip(columns.names[start:stop], types, *numeric))
+            yield flush()
+    else:
+        rows = dataset.data or []
+        fieldnames = _fieldnames(rows)
+        writer.writerow(fieldnames)
+        yield flush()
+        for start, stop in _batches(len(rows)):
+            writer.writerows([row.get(name, '') for name in fieldnames] for row in rows[start:stop])
+            yield flush()
+
+
+def iter_ndjson(dataset):
+    """One JSON object per line; stored numbers are sent as numbers, missing ones as null"""
+    if dataset.is_columnar:
+        columns = dataset.get_columns()
+        labels = columns.type_labels
+        for start, stop in _batches(len(columns)):
+            numeric = [
+                [None if math.isnan(value) else value for value in columns.numeric[name][start:stop].tolist()]
+                for name in NUMERIC_COLUMNS
+            ]
+            types = [labels[code] for code in columns.type_codes[start:stop].tolist()]
+            lines = [
+                json.dumps(dict(zip(SCHEMA, values)))
+                for values in zip(columns.names[start:stop], types, *numeric)
+            ]
+            yield ('\n'.join(lines) + '\n').encode()
+    else:
+        rows = dataset.data or []
+        for start, stop in _batches(len(rows)):
+            yield ''.join(json.dumps(row) + '\n' for row in rows[start:stop]).encode()
+
+
+EXPORTERS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+}
+
+
+def write_npz(dataset, output):
+    """Write the dataset's columns to ``output`` as a deflate-compressed ``.npz``"""
+    columns = dataset.get_columns()
+    offsets, payload = string_buffers(dataset.col_names if dataset.is_columnar else pack_strings(columns.names))
+    arrays = {
+        'name_offsets': offsets,
+        'name_data': payload,
+        'type_codes': np.asarray(columns.type_codes, dtype='<i4'),
+        'type_labels': np.array(columns.type_labels, dtype=str),
+    }
+    for name in NUMERIC_COLUMNS:
+        arrays[name.lower()] = np.asarray(columns.numeric[name], dtype='<f8')
+    np.savez_compressed(output, **arrays)
+
+
+def read_npz(source):
+    """Decode ``write_npz`` output into ``Columns``"""
+    with np.load(source) as npz:
+        offsets = npz['name_offsets'].tolist()
+        payload = npz['name_data'].tobytes()
+        names = [payload[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+        return Columns(
+            names,
+            npz['type_labels'].tolist(),
+            npz['type_codes'],
+            {name: npz[name.lower()] for name in NUMERIC_COLUMNS},
+        )
+
+
+def gzip_chunks(chunks, level=6):
+    """gzip-compress a stream of byte chunks as it is produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(request):
+    encodings = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return any(part.split(';')[0].strip() == 'gzip' for part in encodings.split(','))
@@ -0,0 +1,365 @@
+"""
+Streaming CSV ingestion for uploaded equipment datasets.
+
+The uploaded file is read in fixed-size chunks, decoded incrementally and
+parsed row by row, so the raw upload is never held in memory as one string.
+Each parsed row is fed to the typed column buffers, the summary and
+per-type accumulators, the quantile sketches and the storage writer in the
+same pass, and the CSV bytes are hashed for the dataset's ``content_hash``.
+
+gzip uploads (and zstd ones when the optional ``zstandard`` package is
+installed) are recognized by their magic bytes or ``Content-Encoding``
+and decompressed chunk by chunk on the way to the parser, so neither the
+compressed nor the decompressed file is ever held whole.
+
+Uploads of at least ``CSV_PARALLEL_THRESHOLD`` bytes are parsed on several
+cores instead: the spooled file is memory-mapped, split into chunks at
+newlines, and each chunk is parsed into columns, accumulators and sketches
+in a process pool; the partial results are then merged in file order. This
+only applies to files in the columnar schema without quote characters, as
+a quoted field could hide a newline that a chunk boundary would split.
+"""
+import codecs
+import csv
+import hashlib
+import io
+import mmap
+import shutil
+import tempfile
+import zlib
+from contextlib import ExitStack
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.core.files import File
+
+from .columnar import NUMERIC_COLUMNS, Columns, ColumnarWriter, is_columnar_schema
+from .sketches import KLLSketch
+from .stats import GroupedAccumulator, SummaryAccumulator
+from .summary import compute_summary
+from .workers import process_pool
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Parsed rows are folded into the summary accumulator in batches of this size
+ACCUMULATE_BATCH = 8192
+
+
+def get_chunk_size():
+    """Chunk size (in bytes) used when reading uploaded files"""
+    return getattr(settings, 'CSV_UPLOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def get_parallel_threshold():
+    """Uploads of at least this many bytes are parsed in parallel"""
+    return getattr(settings, 'CSV_PARALLEL_THRESHOLD', 64 * 1024 * 1024)
+
+
+def get_parse_workers():
+    return getattr(settings, 'CSV_PARSE_WORKERS', 1)
+
+
+# Leading bytes of each supported compressed format
+COMPRESSION_MAGIC = {
+    'gzip': b'\x1f\x8b',
+    'zstd': b'\x28\xb5\x2f\xfd',
+}
+COMPRESSION_SUFFIXES = ('.gz', '.zst', '.zstd')
+
+
+def detect_compression(head):
+    """``'gzip'``, ``'zstd'`` or None, from the first bytes of a file"""
+    for encoding, magic in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return encoding
+    return None
+
+
+def strip_compression_suffix(filename):
+    """``data.csv.gz`` -> ``data.csv``"""
+    for suffix in COMPRESSION_SUFFIXES:
+        if filename.lower().endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+def gunzipped(chunks, max_length):
+    """Decompress a gzip stream (possibly several concatenated members) in pieces of at most ``max_length`` bytes"""
+    decompressor = zlib.decompressobj(31)
+    fed = False
+    for chunk in chunks:
+        while chunk:
+            fed = True
+            data = decompressor.decompress(chunk, max_length)
+            if data:
+                yield data
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(31)
+                fed = False
+            else:
+                chunk = decompressor.unconsumed_tail
+    if fed:
+        data = decompressor.flush()
+        if not decompressor.eof:
+            raise ValueError('Compressed file is truncated')
+        if data:
+            yield data
+
+
+def unzstded(chunks):
+    """Decompress a zstd stream"""
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+
+
+def decompressed(chunks, content_encoding=None, chunk_size=None):
+    """Pass plain chunks through; decompress gzip or zstd ones.
+
+    The format comes from ``content_encoding`` if given, else from the
+    magic bytes at the start of the stream.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, b'')
+    encoding = (content_encoding or '').strip().lower() or detect_compression(first)
+    chunks = chain([first], chunks)
+    if encoding in (None, 'identity'):
+        return chunks
+    if encoding == 'gzip':
+        return gunzipped(chunks, chunk_size or get_chunk_size())
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise ValueError('zstd-compressed uploads need the zstandard package on the server')
+        return unzstded(chunks)
+    raise ValueError(f'Unsupported Content-Encoding: {content_encoding}')
+
+
+def iter_lines(chunks, encoding='utf-8-sig'):
+    """Decode an iterable of byte chunks into lines, keeping line endings.
+
+    Multi-byte characters and lines that straddle a chunk boundary are
+    carried over to the next chunk, so only one chunk plus one partial line
+    is buffered at a time.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ''
+    for chunk in chunks:
+        text = pending + decoder.decode(chunk)
+        lines = text.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+class JSONRowWriter:
+    """Collects parsed rows for the ``Dataset.data`` JSON column.
+
+    Only used for files whose header does not match the columnar schema,
+    so that extra or renamed columns are kept verbatim.
+    """
+
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+
+    def store(self, dataset):
+        dataset.data = self.rows
+        dataset.row_count = len(self.rows)
+
+
+class StoredFile(File):
+    """A CSV file already on local disk, ingested like an upload spooled to disk"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def hashed(chunks, digest):
+    """Pass ``chunks`` through unchanged, feeding each one to ``digest``"""
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+
+class IngestResult:
+    def __init__(self, writer, columns, accumulator, grouped, sketches, content_hash=''):
+        self.writer = writer
+        self.content_hash = content_hash
+        self.columns = columns
+        self.accumulator = accumulator
+        self.summary = compute_summary(columns, accumulator)
+        self.type_summary = grouped.as_dict()
+        self.sketches = {name.lower(): sketch.to_dict() for name, sketch in sketches.items()}
+
+    @property
+    def row_count(self):
+        return len(self.columns)
+
+
+def ingest_csv(uploaded_file, chunk_size=None, workers=None, content_encoding=None):
+    """Parse an uploaded CSV file in a single streaming pass.
+
+    ``uploaded_file`` is a Django ``UploadedFile``; it is consumed through
+    ``chunks()`` so peak memory is bounded by ``chunk_size`` rather than by
+    the size of the upload. Rows are always parsed into typed columns for
+    the summary engine; those columns are also the storage when the header
+    matches the equipment schema, otherwise rows go to a ``JSONRowWriter``.
+
+    Compressed uploads are decompressed on the fly (see ``decompressed``);
+    ``content_encoding`` is the request's ``Content-Encoding``, if any.
+    Large uncompressed uploads are handed to ``ingest_csv_parallel`` when
+    more than one worker is configured (``workers`` overrides
+    ``CSV_PARSE_WORKERS``).
+    """
+    workers = get_parse_workers() if workers is None else workers
+    size = uploaded_file.size or 0
+    if workers > 1 and size and size >= get_parallel_threshold() and not content_encoding:
+        result = ingest_csv_parallel(uploaded_file, workers)
+        if result is not None:
+            return result
+        uploaded_file.seek(0)
+
+    digest = hashlib.sha256()
+    chunk_size = chunk_size or get_chunk_size()
+    chunks = decompressed(uploaded_file.chunks(chunk_size), content_encoding, chunk_size)
+    chunks = hashed(chunks, digest)
+    reader = csv.DictReader(iter_lines(chunks))
+    columnar = ColumnarWriter()
+    writer = columnar if is_columnar_schema(reader.fieldnames) else JSONRowWriter()
+    accumulator = SummaryAccumulator()
+    grouped = GroupedAccumulator()
+    sketches = {name: KLLSketch() for name in NUMERIC_COLUMNS}
+    columns = columnar.columns
+
+    def accumulate(start):
+        accumulator.add_columns(columns, start)
+        grouped.add_columns(columns, start)
+        for name, sketch in sketches.items():
+            sketch.update(columns.numeric[name][start:])
+        return len(columns)
+
+    accumulated = 0
+    for row in reader:
+        columnar.write(row)
+        if writer is not columnar:
+            writer.write(row)
+        if len(columns) - accumulated >= ACCUMULATE_BATCH:
+            accumulated = accumulate(accumulated)
+    accumulate(accumulated)
+
+    return IngestResult(writer, columns, accumulator, grouped, sketches, digest.hexdigest())
+
+
+def parse_chunk(path, start, stop, fieldnames):
+    """Parse bytes ``start:stop`` of the CSV at ``path``; runs in pool workers.
+
+    The range must start and end at line boundaries. Returns the chunk's
+    ``(columns, accumulator, grouped, sketches)``.
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        text = mapped[start:stop].decode('utf-8')
+    columnar = ColumnarWriter()
+    for row in csv.DictReader(io.StringIO(text, newline=''), fieldnames):
+        columnar.write(row)
+    columns = columnar.columns
+    sketches = {name: KLLSketch().update(columns.numeric[name]) for name in NUMERIC_COLUMNS}
+    return columns, SummaryAccumulator.from_columns(columns), GroupedAccumulator.from_columns(columns), sketches
+
+
+def split_lines(mapped, start, parts):
+    """``(start, stop)`` byte ranges of about equal size from ``start`` to the end, cut after newlines"""
+    size = len(mapped)
+    bounds = [start]
+    for part in range(1, parts):
+        cut = mapped.find(b'\n', max(bounds[-1], start + (size - start) * part // parts))
+        if cut == -1:
+            break
+        if cut + 1 < size:
+            bounds.append(cut + 1)
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def merge_columns(parts):
+    """Concatenate per-chunk ``Columns``, re-coding types to first-appearance order"""
+    merged = Columns.empty()
+    codes = {}
+    for part in parts:
+        mapping = np.array(
+            [codes.setdefault(label, len(codes)) for label in part.type_labels], dtype=np.int32,
+        )
+        merged.names.extend(part.names)
+        if len(part):
+            merged.type_codes.frombytes(mapping[np.asarray(part.type_codes)].astype(np.int32).tobytes())
+        for name in NUMERIC_COLUMNS:
+            merged.numeric[name].extend(part.numeric[name])
+    merged.type_labels.extend(codes)
+    return merged
+
+
+def spooled_path(uploaded_file, stack):
+    """Path of the upload on disk, copying it to a temporary file if it is only in memory"""
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return uploaded_file.temporary_file_path()
+    spool = stack.enter_context(tempfile.NamedTemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR))
+    uploaded_file.seek(0)
+    shutil.copyfileobj(uploaded_file, spool, get_chunk_size())
+    spool.flush()
+    return spool.name
+
+
+def ingest_csv_parallel(uploaded_file, workers):
+    """Parse a large upload in a pool of ``workers`` processes.
+
+    Returns None, without consuming the upload, if the file is compressed,
+    not in the columnar schema or contains quote characters; the caller
+    then parses it serially.
+    """
+    with ExitStack() as stack:
+        path = spooled_path(uploaded_file, stack)
+        f = stack.enter_context(open(path, 'rb'))
+        mapped = stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+        header_end = mapped.find(b'\n') + 1
+        if detect_compression(mapped[:4]) or not header_end or mapped.find(b'"') != -1:
+            return None
+        fieldnames = next(csv.reader([mapped[:header_end].decode('utf-8-sig')]))
+        if not is_columnar_schema(fieldnames):
+            return None
+
+        pool = stack.enter_context(process_pool(workers))
+        futures = [
+            pool.submit(parse_chunk, path, start, stop, fieldnames)
+            for start, stop in split_lines(mapped, header_end, workers * 4)
+        ]
+        # Hash while the workers parse
+        digest = hashlib.sha256(mapped)
+        parts = [future.result() for future in futures]
+
+    columns = merge_columns([part[0] for part in parts])
+    accumulator = SummaryAccumulator()
+    grouped = GroupedAccumulator()
+    sketches = {name: KLLSketch() for name in NUMERIC_COLUMNS}
+    for _, part_accumulator, part_grouped, part_sketches in parts:
+        accumulator.merge(part_accumulator)
+        grouped.merge(part_grouped)
+        for name, sketch in sketches.items():
+            sketch.merge(part_sketches[name])
+
+    writer = ColumnarWriter()
+    writer.columns = columns
+    return IngestResult(writer, columns, accumulator, grouped, sketches, digest.hexdigest())
@@ -0,0 +1,209 @@
+"""
+Background jobs: work too slow for a request, queued in the ``Job`` table.
+
+``manage.py report_worker`` claims pending jobs and runs them in a process
+pool. Deployments without that process still get their jobs run: while no
+worker has sent a heartbeat within ``WORKER_HEARTBEAT_TIMEOUT`` seconds,
+``dispatch`` hands jobs to a background thread of the web process
+(``JOB_FALLBACK = 'thread'``), outside the request that queued them, so
+gunicorn's request timeout never applies. Whoever runs a job claims it
+first with a conditional UPDATE, so a job runs once however many threads
+and workers see it.
+
+Every process running jobs keeps a ``WorkerHeartbeat`` fresh. Running
+jobs whose runner stopped beating (a killed worker, a restarted web
+process) are put back in the queue by ``requeue_stale``, which workers
+call on every poll and status requests call before answering.
+
+``JOB_FALLBACK = 'inline'`` runs jobs in the calling thread instead (for
+tests), and ``'none'`` leaves them to the worker.
+"""
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import Dataset, Job, WorkerHeartbeat
+
+_executor = None
+_executor_lock = threading.Lock()
+# Jobs submitted to this process's background thread and not finished yet
+_submitted = set()
+
+
+class Heartbeat:
+    """Keeps a ``WorkerHeartbeat`` row fresh from a daemon thread while in use.
+
+    Beats every third of ``WORKER_HEARTBEAT_TIMEOUT``; the row is removed
+    on exit.
+    """
+
+    def __init__(self, dedicated):
+        kind = 'worker' if dedicated else 'web'
+        self.name = f'{kind}:{socket.gethostname()}:{os.getpid()}'
+        self.dedicated = dedicated
+        self._stop = threading.Event()
+        self._thread = None
+
+    def beat(self):
+        WorkerHeartbeat.objects.update_or_create(
+            name=self.name, defaults={'dedicated': self.dedicated, 'last_seen': timezone.now()})
+
+    def _run(self):
+        try:
+            while not self._stop.wait(settings.WORKER_HEARTBEAT_TIMEOUT / 3):
+                self.beat()
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self.beat()
+        self._thread = threading.Thread(target=self._run, name='equipment-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        WorkerHeartbeat.objects.filter(name=self.name).delete()
+
+
+def heartbeat_cutoff():
+    return timezone.now() - timedelta(seconds=settings.WORKER_HEARTBEAT_TIMEOUT)
+
+
+def worker_alive():
+    """Whether a ``report_worker`` has sent a heartbeat recently"""
+    return WorkerHeartbeat.objects.filter(dedicated=True, last_seen__gte=heartbeat_cutoff()).exists()
+
+
+def requeue_stale():
+    """Put running jobs whose runner stopped sending heartbeats back in the queue.
+
+    Returns the number of jobs requeued.
+    """
+    cutoff = heartbeat_cutoff()
+    WorkerHeartbeat.objects.filter(last_seen__lt=cutoff).delete()
+    alive = WorkerHeartbeat.objects.values('name')
+    return (Job.objects.filter(status=Job.RUNNING)
+            .exclude(worker__in=alive)
+            .update(status=Job.PENDING, worker='', started_at=None))
+
+
+def run_job(job_id):
+    """Run a claimed job and record how it ended.
+
+    Returns ``(job_id, status, error)``; the job row is updated here so a
+    crashed parent does not lose the result.
+    """
+    from . import reports, uploads
+
+    try:
+        job = Job.objects.get(pk=job_id)
+        if job.kind == Job.REPORT:
+            reports.render_to_cache(job.dataset_id, job.mode)
+        elif job.kind == Job.RECORDS:
+            Dataset.objects.only('id', 'row_count').get(pk=job.dataset_id).write_records()
+        elif job.kind == Job.INGEST:
+            uploads.ingest_upload(job.upload_id)
+        else:
+            raise ValueError(f'Unknown job kind {job.kind!r}')
+        job_status, error = Job.DONE, ''
+    except Exception as e:
+        job_status, error = Job.FAILED, f'{type(e).__name__}: {e}'
+    Job.objects.filter(pk=job_id).update(status=job_status, error=error, finished_at=timezone.now())
+    return job_id, job_status, error
+
+
+def claim_job(job_id, worker=''):
+    """Mark a pending job as running under ``worker``; False if someone else claimed it first"""
+    return bool(Job.objects.filter(pk=job_id, status=Job.PENDING).update(
+        status=Job.RUNNING, started_at=timezone.now(), worker=worker))
+
+
+def claim_jobs(limit, worker=''):
+    """Mark up to ``limit`` pending jobs as running, oldest first, and return their ids.
+
+    The status check in the UPDATE makes claiming safe with several
+    workers polling the same table.
+    """
+    pending = (Job.objects.filter(status=Job.PENDING)
+               .order_by('created_at', 'id').values_list('id', flat=True)[:limit])
+    return [job_id for job_id in pending if claim_job(job_id, worker)]
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        with Heartbeat(dedicated=False) as heartbeat:
+            if claim_job(job_id, heartbeat.name):
+                run_job(job_id)
+    finally:
+        with _executor_lock:
+            _submitted.discard(job_id)
+        connection.close()
+
+
+def run_in_background(job_id):
+    """Run a job on this process's background thread, one job at a time"""
+    global _executor
+    with _executor_lock:
+        if job_id in _submitted:
+            return
+        _submitted.add(job_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='equipment-jobs')
+    _executor.submit(_run_in_thread, job_id)
+
+
+def dispatch(job):
+    """Start a pending ``job`` according to ``JOB_FALLBACK`` once the current transaction commits.
+
+    With ``'thread'`` nothing is started while a worker is alive; it takes
+    the job from the queue.
+    """
+    fallback = settings.JOB_FALLBACK
+    if fallback == 'inline':
+        if claim_job(job.id):
+            run_job(job.id)
+        job.refresh_from_db()
+    elif fallback == 'thread' and not worker_alive():
+        transaction.on_commit(lambda: run_in_background(job.id))
+
+
+def poll(job):
+    """Refresh ``job`` for a status request, restarting it if whoever ran it is gone"""
+    requeue_stale()
+    job.refresh_from_db()
+    if job.status == Job.PENDING:
+        dispatch(job)
+    return job
+
+
+def enqueue(kind, dataset, **fields):
+    """Queue and dispatch a job, or poll the matching one already pending or running"""
+    job = Job.objects.filter(kind=kind, dataset=dataset, status__in=Job.ACTIVE, **fields).first()
+    if job is not None:
+        return poll(job)
+    job = Job.objects.create(kind=kind, dataset=dataset, **fields)
+    dispatch(job)
+    return job
+
+
+def queue_records(dataset):
+    """Make sure the EquipmentRecord rows of ``dataset`` are written or on their way.
+
+    Returns None once they are written, else the pending or running job.
+    """
+    if dataset.records_written:
+        return None
+    job = enqueue(Job.RECORDS, dataset)
+    if job.status == Job.DONE:
+        dataset.records_written = True
+        return None
+    return job
@@ -0,0 +1,154 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from equipment_api import cache, reports
+from equipment_api.models import Dataset
+from equipment_api.stats import GroupedAccumulator
+from equipment_api.summary import build_sketches
+from equipment_api.workers import process_pool
+
+
+def backfill_dataset(dataset_id, dry_run=False, record_batch_size=None):
+    """Migrate one dataset to columnar storage, stored summaries, sketches, records and content hash.
+
+    Returns ``(dataset_id, row_count, error)``. Each dataset is written in
+    its own transaction so no lock is held across datasets, and its cached
+    responses and reports are dropped once it has been rewritten.
+    """
+    try:
+        dataset = Dataset.objects.get(pk=dataset_id)
+        converted = dataset.convert_to_columnar()
+        columns = dataset.get_columns()
+        stale_summary = (
+            converted
+            or dataset.summary is None
+            or dataset.summary_version != Dataset.SUMMARY_VERSION
+        )
+        if stale_summary:
+            dataset.summary = dataset.compute_summary()
+            dataset.summary_version = Dataset.SUMMARY_VERSION
+        missing_derived = (
+            converted
+            or dataset.quantile_sketches is None
+            or dataset.type_summary is None
+        )
+        if missing_derived:
+            dataset.quantile_sketches = build_sketches(columns)
+            dataset.type_summary = GroupedAccumulator.from_columns(columns).as_dict()
+        missing_records = dataset.records.count() != len(columns)
+        stale_row_count = dataset.row_count != len(columns)
+        dataset.row_count = len(columns)
+        missing_hash = not dataset.content_hash
+        if missing_hash:
+            dataset.content_hash = dataset.compute_content_hash()
+
+        rewritten = converted or stale_summary or missing_derived or missing_hash or stale_row_count
+        if not dry_run:
+            with transaction.atomic():
+                if converted:
+                    dataset.save()
+                elif rewritten:
+                    dataset.save(update_fields=[
+                        'summary', 'summary_version', 'type_summary', 'quantile_sketches',
+                        'content_hash', 'row_count',
+                    ])
+                if missing_records:
+                    dataset.write_records(batch_size=record_batch_size, rewrite=True)
+            if rewritten or missing_records:
+                cache.invalidate_dataset(dataset_id)
+                cache.invalidate(cache.LIST_SCOPE)
+                reports.invalidate(dataset_id)
+        return dataset_id, len(columns), None
+    except Exception as e:
+        return dataset_id, 0, f'{type(e).__name__}: {e}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Backfill legacy datasets into columnar storage, stored summaries, per-type '
+        'statistics, quantile sketches and EquipmentRecord rows. Resumable via a '
+        'checkpoint file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20,
+                            help='Datasets processed between checkpoints (default: 20)')
+        parser.add_argument('--record-batch-size', type=int, default=None,
+                            help='Rows per bulk_create batch (default: EQUIPMENT_RECORD_BATCH_SIZE)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of worker processes (default: 1)')
+        parser.add_argument('--checkpoint', default=None,
+                            help='Checkpoint file (default: MEDIA_ROOT/backfill_datasets.json)')
+        parser.add_argument('--reset', action='store_true',
+                            help='Ignore an existing checkpoint and start from the first dataset')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after this many datasets')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Convert without writing and report throughput and projected time')
+
+    def handle(self, *args, **options):
+        checkpoint = Path(options['checkpoint'] or Path(settings.MEDIA_ROOT) / 'backfill_datasets.json')
+        dry_run = options['dry_run']
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+
+        last_id = 0
+        if checkpoint.exists() and not options['reset']:
+            last_id = json.loads(checkpoint.read_text()).get('last_id', 0)
+            self.stdout.write(f'Resuming after dataset {last_id}')
+
+        pending = Dataset.objects.filter(id__gt=last_id).order_by('id')
+        total = pending.count()
+        if options['limit'] is not None:
+            total = min(total, options['limit'])
+        self.stdout.write(f'{total} datasets to process with {workers} worker(s)'
+                          + (' (dry run)' if dry_run else ''))
+
+        pool = process_pool(workers) if workers > 1 else None
+        done = rows = 0
+        started = time.monotonic()
+        try:
+            while done < total:
+                ids = list(pending.filter(id__gt=last_id)
+                           .values_list('id', flat=True)[:min(batch_size, total - done)])
+                if not ids:
+                    break
+                args = (ids, [dry_run] * len(ids), [options['record_batch_size']] * len(ids))
+                results = pool.map(backfill_dataset, *args) if pool else map(backfill_dataset, *args)
+
+                for dataset_id, row_count, error in results:
+                    if error:
+                        self._save_checkpoint(checkpoint, last_id, dry_run)
+                        raise CommandError(f'Dataset {dataset_id} failed: {error}')
+                    last_id = dataset_id
+                    done += 1
+                    rows += row_count
+
+                self._save_checkpoint(checkpoint, last_id, dry_run)
+                self._report(done, total, rows, time.monotonic() - started)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {done} datasets ({rows} rows) in {time.monotonic() - started:.1f}s'
+        ))
+
+    def _save_checkpoint(self, checkpoint, last_id, dry_run):
+        if dry_run:
+            return
+        checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint.write_text(json.dumps({'last_id': last_id}))
+
+    def _report(self, done, total, rows, elapsed):
+        elapsed = max(elapsed, 1e-9)
+        remaining = (total - done) * elapsed / done
+        self.stdout.write(
+            f'{done}/{total} datasets, {rows} rows, {rows / elapsed:,.0f} rows/s, '
+            f'projected {remaining:.1f}s remaining'
+        )
@@ -0,0 +1,201 @@
+import io
+import json
+import os
+import resource
+import tempfile
+import time
+from array import array
+
+import numpy as np
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from equipment_api.columnar import NUMERIC_COLUMNS, Columns
+from equipment_api.export import iter_csv, read_npz, write_npz
+from equipment_api.ingest import ingest_csv, ingest_csv_parallel
+from equipment_api.models import Dataset
+from equipment_api.reports import build_report
+from equipment_api.summary import compute_summary
+
+
+TYPE_LABELS = ['Pump', 'Compressor', 'Valve', 'HeatExchanger', 'Reactor', 'Condenser']
+
+
+def synthetic_columns(n, seed=0):
+    """Random columns shaped like real equipment exports"""
+    rng = np.random.default_rng(seed)
+    numeric = {
+        'Flowrate': rng.normal(120, 35, n),
+        'Pressure': rng.normal(6, 1.3, n),
+        'Temperature': rng.normal(117, 14, n),
+    }
+    codes = rng.integers(0, len(TYPE_LABELS), n).astype(np.int32)
+    names = [f'{TYPE_LABELS[c]}-{i}' for i, c in enumerate(codes.tolist())]
+    return Columns(names, list(TYPE_LABELS), codes, numeric)
+
+
+def python_summary(columns):
+    """The pre-NumPy implementation of Dataset.compute_summary, for comparison"""
+    def present(name):
+        return [v for v in columns.numeric[name] if v == v]
+
+    def std_dev(values):
+        if not values:
+            return 0
+        mean = sum(values) / len(values)
+        variance = sum((x - mean) ** 2 for x in values) / len(values)
+        return variance ** 0.5
+
+    code_counts = [0] * len(columns.type_labels)
+    for code in columns.type_codes:
+        code_counts[code] += 1
+    statistics = {}
+    for name in NUMERIC_COLUMNS:
+        values = present(name)
+        statistics[name.lower()] = {
+            'average': sum(values) / len(values) if values else 0,
+            'min': min(values) if values else 0,
+            'max': max(values) if values else 0,
+            'std': std_dev(values),
+        }
+    return {
+        'total_count': len(columns),
+        'equipment_types': dict(zip(columns.type_labels, code_counts)),
+        'statistics': statistics,
+    }
+
+
+def timed(func, *args, repeat=1):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Run performance benchmarks for the equipment API'
+
+    # Suite name -> default row counts
+    suites = {
+        'summary': '10000,1000000,10000000',
+        'pdf': '1000,10000,100000',
+        'wire': '10000,100000,1000000',
+        'ingest': '100000,1000000',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=list(self.suites))
+        parser.add_argument('--sizes', default=None,
+                            help='Comma-separated row counts (default: 10k, 1M, 10M; '
+                                 '1k, 10k, 100k for pdf; 10k, 100k, 1M for wire; 100k, 1M for ingest)')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per measurement; the best time is reported')
+        parser.add_argument('--workers', default=None,
+                            help='Comma-separated worker counts for ingest (default: 1, 2, 4, ... up to the CPU count)')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in (options['sizes'] or self.suites[options['suite']]).split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        if options['suite'] == 'ingest':
+            cpus = os.cpu_count() or 1
+            default = [2 ** i for i in range(cpus.bit_length()) if 2 ** i < cpus] + [cpus]
+            try:
+                self.workers = [int(w) for w in options['workers'].split(',')] if options['workers'] else default
+            except ValueError:
+                raise CommandError('--workers must be a comma-separated list of integers')
+        getattr(self, f'bench_{options["suite"]}')(sizes, max(1, options['repeat']))
+
+    def bench_summary(self, sizes, repeat):
+        """Python-loop summary vs the vectorized summary engine"""
+        self.stdout.write(f'{"rows":>12} {"python (s)":>12} {"numpy (s)":>12} {"speed-up":>10}')
+        for n in sizes:
+            columns = synthetic_columns(n)
+            # The Python implementation iterated array('d') columns
+            legacy = Columns(
+                columns.names, columns.type_labels, array('i', columns.type_codes),
+                {name: array('d', values) for name, values in columns.numeric.items()},
+            )
+            python_time = timed(python_summary, legacy, repeat=repeat)
+            numpy_time = timed(compute_summary, columns, repeat=repeat)
+            self.stdout.write(
+                f'{n:>12,} {python_time:>12.4f} {numpy_time:>12.4f} {python_time / numpy_time:>9.1f}x'
+            )
+
+    def bench_pdf(self, sizes, repeat):
+        """Full (every row) PDF report rendering throughput"""
+        self.stdout.write(f'{"rows":>12} {"pages":>8} {"time (s)":>10} {"pages/s":>10} {"rows/s":>12} {"peak RSS (MB)":>14}')
+        for n in sizes:
+            dataset = Dataset(id=0, filename='benchmark.csv', uploaded_at=timezone.now())
+            dataset.set_columns(synthetic_columns(n))
+            summary = dataset.compute_summary()
+            pages = []
+
+            def render():
+                with tempfile.TemporaryFile() as output:
+                    pages.append(build_report(dataset, summary, output, mode='full'))
+
+            elapsed = timed(render, repeat=repeat)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            self.stdout.write(
+                f'{n:>12,} {pages[-1]:>8,} {elapsed:>10.2f} {pages[-1] / elapsed:>10.1f} '
+                f'{n / elapsed:>12,.0f} {peak:>14.0f}'
+            )
+
+    def bench_wire(self, sizes, repeat):
+        """JSON rows (as in the dataset detail) vs typed .npz columns: size, encode and decode time"""
+        self.stdout.write(
+            f'{"rows":>12} {"format":>7} {"size (MB)":>10} {"encode (s)":>11} {"decode (s)":>11}'
+        )
+        for n in sizes:
+            dataset = Dataset(id=0, filename='benchmark.csv')
+            dataset.set_columns(synthetic_columns(n))
+            payloads = {}
+
+            def encode_json():
+                payloads['json'] = JSONRenderer().render(dataset.get_rows())
+
+            def encode_npz():
+                output = io.BytesIO()
+                write_npz(dataset, output)
+                payloads['npz'] = output.getvalue()
+
+            json_encode = timed(encode_json, repeat=repeat)
+            json_decode = timed(json.loads, payloads['json'], repeat=repeat)
+            npz_encode = timed(encode_npz, repeat=repeat)
+            npz_decode = timed(lambda: read_npz(io.BytesIO(payloads['npz'])), repeat=repeat)
+            for name, encode, decode in (('json', json_encode, json_decode), ('npz', npz_encode, npz_decode)):
+                self.stdout.write(
+                    f'{n:>12,} {name:>7} {len(payloads[name]) / 1e6:>10.2f} {encode:>11.4f} {decode:>11.4f}'
+                )
+
+    def bench_ingest(self, sizes, repeat):
+        """CSV upload parsing throughput, serial vs parallel, by number of worker processes"""
+        self.stdout.write(f'{"rows":>12} {"size (MB)":>10} {"workers":>8} {"time (s)":>10} {"rows/s":>12} {"speed-up":>9}')
+        for n in sizes:
+            dataset = Dataset(id=0, filename='benchmark.csv')
+            dataset.set_columns(synthetic_columns(n))
+            upload = TemporaryUploadedFile('benchmark.csv', 'text/csv', 0, 'utf-8')
+            for chunk in iter_csv(dataset):
+                upload.write(chunk)
+            upload.size = upload.tell()
+            upload.flush()
+            serial = None
+            for workers in self.workers:
+                if workers > 1:
+                    elapsed = timed(ingest_csv_parallel, upload, workers, repeat=repeat)
+                else:
+                    elapsed = timed(ingest_csv, upload, None, 1, repeat=repeat)
+                serial = serial or (elapsed if workers == 1 else None)
+                speed_up = f'{serial / elapsed:>8.1f}x' if serial else f'{"":>9}'
+                self.stdout.write(
+                    f'{n:>12,} {upload.size / 1e6:>10.1f} {workers:>8} {elapsed:>10.2f} {n / elapsed:>12,.0f} {speed_up}'
+                )
+            upload.close()
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.core.management.base import BaseCommand
+
+from equipment_api.jobs import Heartbeat, claim_jobs, requeue_stale, run_job
+from equipment_api.workers import process_pool
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (PDF reports, EquipmentRecord writes, upload ingestion) in a local process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Number of worker processes (default: 2)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds between checks for new jobs (default: 1)')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no jobs are pending instead of polling forever')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        self.stdout.write(f'Running jobs with {workers} worker(s)')
+
+        pool = process_pool(workers) if workers > 1 else None
+        in_flight = set()
+        try:
+            with Heartbeat(dedicated=True) as heartbeat:
+                while True:
+                    # Jobs of runners that stopped sending heartbeats, e.g. killed workers
+                    stale = requeue_stale()
+                    if stale:
+                        self.stdout.write(f'Requeued {stale} stale job(s)')
+                    claimed = claim_jobs(workers - len(in_flight), heartbeat.name)
+                    for job_id in claimed:
+                        if pool:
+                            in_flight.add(pool.submit(run_job, job_id))
+                        else:
+                            self._report(*run_job(job_id))
+                    if in_flight:
+                        done, in_flight = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._report(*future.result())
+                    elif not claimed:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool:
+                pool.shutdown()
+
+    def _report(self, job_id, job_status, error):
+        if error:
+            self.stderr.write(f'Job {job_id} failed: {error}')
+        else:
+            self.stdout.write(f'Job {job_id} {job_status}')
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0002_alter_dataset_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='summary',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='summary_version',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0003_dataset_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='col_flowrate',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='col_names',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='col_pressure',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='col_temperature',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='col_type_codes',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='col_type_labels',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
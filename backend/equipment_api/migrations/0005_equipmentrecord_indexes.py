@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0004_dataset_columnar_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='flowrate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='pressure',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='temperature',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'equipment_type'], name='record_dataset_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'flowrate'], name='record_dataset_flowrate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'pressure'], name='record_dataset_pressure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'temperature'], name='record_dataset_temp_idx'),
+        ),
+    ]
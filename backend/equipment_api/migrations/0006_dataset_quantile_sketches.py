@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0005_equipmentrecord_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='quantile_sketches',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
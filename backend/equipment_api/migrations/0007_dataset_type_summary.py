@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0006_dataset_quantile_sketches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='type_summary',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:08
+
+from django.db import migrations, models
+
+
+def populate_row_count(apps, schema_editor):
+    Dataset = apps.get_model('equipment_api', 'Dataset')
+    for dataset in Dataset.objects.only('id', 'summary', 'data').iterator(chunk_size=50):
+        if dataset.summary:
+            row_count = dataset.summary.get('total_count', 0)
+        else:
+            row_count = len(dataset.data or [])
+        Dataset.objects.filter(pk=dataset.pk).update(row_count=row_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0007_dataset_type_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='row_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_row_count, migrations.RunPython.noop),
+    ]
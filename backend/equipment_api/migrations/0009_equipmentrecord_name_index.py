@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0008_dataset_row_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'equipment_name'], name='record_dataset_name_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def mark_records_written(apps, schema_editor):
+    # Datasets that already have EquipmentRecord rows were written by the
+    # upload or /rows/ before records moved to a background job
+    Dataset = apps.get_model('equipment_api', 'Dataset')
+    Dataset.objects.filter(records__isnull=False).update(records_written=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0013_uploadsession'),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name='ReportJob',
+            new_name='Job',
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('report', 'PDF report'), ('records', 'Equipment records')], default='report', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='dataset',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='equipment_api.dataset'),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='records_written',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_records_written, migrations.RunPython.noop),
+    ]
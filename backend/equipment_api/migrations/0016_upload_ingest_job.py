@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0015_job_worker_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='upload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='equipment_api.uploadsession'),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='dataset',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='equipment_api.dataset'),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('report', 'PDF report'), ('records', 'Equipment records'), ('ingest', 'Upload ingestion')], default='report', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('open', 'Open'), ('ingesting', 'Ingesting'), ('complete', 'Complete'), ('failed', 'Failed')], default='open', max_length=10),
+        ),
+    ]
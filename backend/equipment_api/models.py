@@ -1,14 +1,56 @@
-from django.db import models
-from django.contrib.auth.models import User
+import hashlib
 import json
+import os
+
+from django.conf import settings
+from django.db import models, transaction
+from django.contrib.auth.models import User
+from .columnar import (
+    NUMERIC_COLUMNS, Columns, ColumnarWriter, is_columnar_schema,
+    pack_array, pack_strings, unpack_array, unpack_strings,
+)
+from .sketches import KLLSketch
+from .stats import GroupedAccumulator
+from .summary import build_sketches, compute_summary
 
 
 class Dataset(models.Model):
     """Model to store uploaded datasets"""
+    # Bump when the shape or definition of the summary changes; stored
+    # summaries with an older version are recomputed on next access.
+    SUMMARY_VERSION = 2
+
+    # Columns holding the rows themselves (legacy JSON or columnar blobs)
+    ROW_STORAGE_FIELDS = [
+        'data', 'col_names', 'col_type_labels', 'col_type_codes',
+        'col_flowrate', 'col_pressure', 'col_temperature',
+    ]
+    # Precomputed artifacts served by their own endpoints
+    DERIVED_FIELDS = ['type_summary', 'quantile_sketches']
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     filename = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
-    data = models.JSONField()  # Store parsed CSV data as JSON
+    # SHA-256 of the uploaded file; the basis of HTTP validators (see conditional.py)
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    row_count = models.PositiveIntegerField(default=0)
+    # Legacy row storage; only used for files that don't match the columnar schema
+    data = models.JSONField(null=True, blank=True)
+    # Columnar row storage, see columnar.py
+    col_names = models.BinaryField(null=True, blank=True)
+    col_type_labels = models.JSONField(null=True, blank=True)
+    col_type_codes = models.BinaryField(null=True, blank=True)
+    col_flowrate = models.BinaryField(null=True, blank=True)
+    col_pressure = models.BinaryField(null=True, blank=True)
+    col_temperature = models.BinaryField(null=True, blank=True)
+    summary = models.JSONField(null=True, blank=True)  # Materialized get_summary() result
+    summary_version = models.PositiveSmallIntegerField(default=0)
+    # Per equipment type count and statistics, see stats.GroupedAccumulator
+    type_summary = models.JSONField(null=True, blank=True)
+    # KLLSketch.to_dict() per numeric column, keyed like summary statistics
+    quantile_sketches = models.JSONField(null=True, blank=True)
+    # Set once EquipmentRecord rows exist for every row, see write_records()
+    records_written = models.BooleanField(default=False)
     
     class Meta:
         ordering = ['-uploaded_at']
@@ -17,57 +59,180 @@ class Dataset(models.Model):
         return f"{self.filename} - {self.uploaded_at.strftime('%Y-%m-%d %H:%M')}"
     
     def get_summary(self):
-        """Calculate summary statistics for the dataset"""
-        if not self.data:
-            return {}
-        
-        # Extract values
-        flowrates = [float(row.get('Flowrate', 0)) for row in self.data if row.get('Flowrate')]
-        pressures = [float(row.get('Pressure', 0)) for row in self.data if row.get('Pressure')]
-        temperatures = [float(row.get('Temperature', 0)) for row in self.data if row.get('Temperature')]
-        
-        # Calculate std dev
-        def std_dev(values):
-            if not values:
-                return 0
-            mean = sum(values) / len(values)
-            variance = sum((x - mean) ** 2 for x in values) / len(values)
-            return variance ** 0.5
-        
-        # Equipment type counts
-        type_counts = {}
-        for row in self.data:
-            eq_type = row.get('Type', 'Unknown')
-            type_counts[eq_type] = type_counts.get(eq_type, 0) + 1
-        
-        # Calculate statistics
-        summary = {
-            'total_count': len(self.data),
-            'equipment_types': type_counts,
-            'statistics': {
-                'flowrate': {
-                    'average': sum(flowrates) / len(flowrates) if flowrates else 0,
-                    'min': min(flowrates) if flowrates else 0,
-                    'max': max(flowrates) if flowrates else 0,
-                    'std': std_dev(flowrates)
-                },
-                'pressure': {
-                    'average': sum(pressures) / len(pressures) if pressures else 0,
-                    'min': min(pressures) if pressures else 0,
-                    'max': max(pressures) if pressures else 0,
-                    'std': std_dev(pressures)
-                },
-                'temperature': {
-                    'average': sum(temperatures) / len(temperatures) if temperatures else 0,
-                    'min': min(temperatures) if temperatures else 0,
-                    'max': max(temperatures) if temperatures else 0,
-                    'std': std_dev(temperatures)
-                }
-            }
+        """Return the stored summary, recomputing it if missing or stale"""
+        if self.summary is None or self.summary_version != self.SUMMARY_VERSION:
+            self.summary = self.compute_summary()
+            self.summary_version = self.SUMMARY_VERSION
+            if self.pk:
+                self.save(update_fields=['summary', 'summary_version'])
+        return self.summary
+
+    def get_type_summary(self):
+        """Per equipment type statistics, computed on first use if missing"""
+        if self.type_summary is None:
+            self.type_summary = GroupedAccumulator.from_columns(self.get_columns()).as_dict()
+            if self.pk:
+                self.save(update_fields=['type_summary'])
+        return self.type_summary
+
+    def get_sketches(self):
+        """Quantile sketches per numeric column, built on first use if missing"""
+        if self.quantile_sketches is None:
+            self.quantile_sketches = build_sketches(self.get_columns())
+            if self.pk:
+                self.save(update_fields=['quantile_sketches'])
+        return {
+            name: KLLSketch.from_dict(state)
+            for name, state in self.quantile_sketches.items()
         }
-        
-        return summary
-    
+
+    def refresh_deferred(self, fields):
+        """Load whichever of ``fields`` were deferred, in a single query"""
+        deferred = self.get_deferred_fields() & set(fields)
+        if deferred:
+            self.refresh_from_db(fields=list(deferred))
+
+    def get_content_hash(self):
+        """SHA-256 of the dataset's content, computed from stored rows if missing.
+
+        Uploads store the hash of the raw file; datasets stored before that
+        get a hash of their stored rows the first time one is needed.
+        """
+        if not self.content_hash:
+            self.refresh_deferred(self.ROW_STORAGE_FIELDS)
+            self.content_hash = self.compute_content_hash()
+            if self.pk:
+                self.save(update_fields=['content_hash'])
+        return self.content_hash
+
+    def compute_content_hash(self):
+        digest = hashlib.sha256()
+        if self.is_columnar:
+            digest.update(json.dumps(self.col_type_labels).encode())
+            for field in ('col_names', 'col_type_codes', 'col_flowrate', 'col_pressure', 'col_temperature'):
+                digest.update(bytes(getattr(self, field)))
+        else:
+            digest.update(json.dumps(self.data, sort_keys=True, separators=(',', ':')).encode())
+        return digest.hexdigest()
+
+    @property
+    def is_columnar(self):
+        return self.col_names is not None
+
+    def set_columns(self, columns):
+        """Store rows in columnar form, replacing any legacy JSON rows"""
+        self.data = None
+        self.row_count = len(columns)
+        self.col_names = pack_strings(columns.names)
+        self.col_type_labels = list(columns.type_labels)
+        self.col_type_codes = pack_array(columns.type_codes)
+        for name in NUMERIC_COLUMNS:
+            setattr(self, f'col_{name.lower()}', pack_array(columns.numeric[name]))
+        self._columns = columns
+
+    def get_columns(self):
+        """Typed columns for the dataset, decoded once per instance.
+
+        Row storage fields that were deferred are loaded in one query.
+        """
+        columns = getattr(self, '_columns', None)
+        if columns is None:
+            self.refresh_deferred(self.ROW_STORAGE_FIELDS)
+            if self.is_columnar:
+                columns = Columns(
+                    unpack_strings(self.col_names),
+                    self.col_type_labels,
+                    unpack_array('i', self.col_type_codes),
+                    {
+                        name: unpack_array('d', getattr(self, f'col_{name.lower()}'))
+                        for name in NUMERIC_COLUMNS
+                    },
+                )
+            else:
+                columns = Columns.from_rows(self.data or [])
+            self._columns = columns
+        return columns
+
+    def convert_to_columnar(self):
+        """Move legacy JSON rows into columnar storage (without saving).
+
+        Returns False and leaves ``data`` untouched if any row has columns
+        outside the schema or a non-numeric value that would be lost.
+        """
+        if self.is_columnar or not self.data:
+            return False
+        writer = ColumnarWriter()
+        try:
+            for row in self.data:
+                if not is_columnar_schema(list(row)):
+                    return False
+                writer.write(row)
+        except ValueError:
+            return False
+        writer.store(self)
+        return True
+
+    def iter_rows(self):
+        """Rows in the original list-of-dicts JSON format"""
+        if self.is_columnar:
+            return self.get_columns().iter_rows()
+        return iter(self.data or [])
+
+    def get_rows(self):
+        if self.is_columnar:
+            return list(self.iter_rows())
+        return self.data or []
+
+    def write_records(self, batch_size=None, rewrite=False):
+        """Create this dataset's EquipmentRecord rows from its stored columns, once.
+
+        Rows are inserted with ``bulk_create`` in batches of ``batch_size``
+        (``EQUIPMENT_RECORD_BATCH_SIZE`` by default) inside one transaction
+        that holds a lock on the dataset row, so concurrent callers wait for
+        the first and then find ``records_written`` set. Returns False if
+        the records were already written, unless ``rewrite`` is set. This
+        takes long for big datasets; requests queue a ``Job.RECORDS`` job
+        instead (see jobs.py).
+        """
+        batch_size = batch_size or settings.EQUIPMENT_RECORD_BATCH_SIZE
+        with transaction.atomic():
+            locked = Dataset.objects.select_for_update().only('id', 'records_written').get(pk=self.pk)
+            if locked.records_written and not rewrite:
+                self.records_written = True
+                return False
+            self.refresh_deferred(self.ROW_STORAGE_FIELDS)
+            columns = self.get_columns()
+            flowrates, pressures, temperatures = (columns.numeric[name] for name in NUMERIC_COLUMNS)
+            labels = [label[:100] for label in columns.type_labels]
+
+            def value(v):
+                return None if v != v else v
+
+            self.records.all().delete()
+            for start in range(0, len(columns), batch_size):
+                stop = min(start + batch_size, len(columns))
+                EquipmentRecord.objects.bulk_create([
+                    EquipmentRecord(
+                        dataset=self,
+                        equipment_name=columns.names[i][:255],
+                        equipment_type=labels[columns.type_codes[i]],
+                        flowrate=value(flowrates[i]),
+                        pressure=value(pressures[i]),
+                        temperature=value(temperatures[i]),
+                    )
+                    for i in range(start, stop)
+                ], batch_size=batch_size)
+            # row_count is not trusted: datasets saved without going through
+            # upload or migration may never have set it
+            self.row_count = len(columns)
+            self.records_written = True
+            Dataset.objects.filter(pk=self.pk).update(row_count=self.row_count, records_written=True)
+        return True
+
+    def compute_summary(self):
+        """Calculate summary statistics for the dataset"""
+        return compute_summary(self.get_columns())
+
     @classmethod
     def cleanup_old_datasets(cls, user, keep_count=5):
         """Keep only the last N datasets per user"""
@@ -83,9 +248,128 @@ class EquipmentRecord(models.Model):
     dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='records')
     equipment_name = models.CharField(max_length=255)
     equipment_type = models.CharField(max_length=100)
-    flowrate = models.FloatField()
-    pressure = models.FloatField()
-    temperature = models.FloatField()
+    flowrate = models.FloatField(null=True, blank=True)
+    pressure = models.FloatField(null=True, blank=True)
+    temperature = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['dataset', 'equipment_type'], name='record_dataset_type_idx'),
+            models.Index(fields=['dataset', 'equipment_name'], name='record_dataset_name_idx'),
+            models.Index(fields=['dataset', 'flowrate'], name='record_dataset_flowrate_idx'),
+            models.Index(fields=['dataset', 'pressure'], name='record_dataset_pressure_idx'),
+            models.Index(fields=['dataset', 'temperature'], name='record_dataset_temp_idx'),
+        ]
     
     def __str__(self):
         return f"{self.equipment_name} ({self.equipment_type})"
+
+
+class Job(models.Model):
+    """Background work queued by requests, run by ``manage.py report_worker``.
+
+    Without a live worker the web process runs jobs on a background thread,
+    see jobs.py. ``worker`` names the ``WorkerHeartbeat`` of whoever claimed
+    the job, so a job whose runner died can be requeued.
+    """
+    REPORT = 'report'  # Render the PDF report of ``dataset`` in ``mode``
+    RECORDS = 'records'  # Write the EquipmentRecord rows of ``dataset``
+    INGEST = 'ingest'  # Ingest the finalized ``upload`` as a new dataset
+    KIND_CHOICES = [
+        (REPORT, 'PDF report'),
+        (RECORDS, 'Equipment records'),
+        (INGEST, 'Upload ingestion'),
+    ]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE = (PENDING, RUNNING)
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=REPORT)
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    upload = models.ForeignKey('UploadSession', on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='jobs')
+    mode = models.CharField(max_length=10, default='summary')  # Report mode, see reports.MODES
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_idx'),
+        ]
+
+    def __str__(self):
+        target = f"upload {self.upload_id}" if self.kind == self.INGEST else f"dataset {self.dataset_id}"
+        return f"{self.get_kind_display()} job {self.id} for {target} ({self.status})"
+
+
+class WorkerHeartbeat(models.Model):
+    """Last sign of life of a process running jobs, refreshed while it runs.
+
+    ``dedicated`` is set for ``report_worker`` processes; web processes
+    running jobs on their fallback thread beat too, but don't count as a
+    worker taking the queue.
+    """
+    name = models.CharField(max_length=255, unique=True)  # kind:host:pid
+    dedicated = models.BooleanField(default=False)
+    last_seen = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} (last seen {self.last_seen})"
+
+
+class UploadSession(models.Model):
+    """A resumable upload, received as byte ranges and ingested by a job on finalize.
+
+    Bytes are written to ``path`` under ``UPLOAD_SESSION_DIR``; ``offset``
+    counts those received in order, so a client can resume from it. Once
+    the ``INGEST`` job ends the session is ``complete`` with its
+    ``dataset``, or ``failed`` with the ``error``.
+    """
+    OPEN = 'open'
+    INGESTING = 'ingesting'
+    COMPLETE = 'complete'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (OPEN, 'Open'),
+        (INGESTING, 'Ingesting'),
+        (COMPLETE, 'Complete'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()  # Total bytes announced by the client
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=OPEN)
+    dataset = models.ForeignKey(Dataset, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='upload_sessions')
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.id} of {self.filename} ({self.offset}/{self.size} bytes)"
+
+    @property
+    def path(self):
+        return os.path.join(settings.UPLOAD_SESSION_DIR, f'{self.id}.part')
+
+    def discard(self):
+        """Remove the received bytes from disk"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
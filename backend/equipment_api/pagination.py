@@ -0,0 +1,113 @@
+"""
+Pagination for row-level endpoints backed by ``EquipmentRecord``.
+
+``RowOffsetPagination`` is plain limit/offset. ``RowKeysetPagination``
+seeks past the last row of the previous page using ``(sort value, id)``,
+so every page is an index range scan no matter how deep it is.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+ORDERING_FIELDS = ('id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature')
+
+
+def get_ordering(request, default='id'):
+    """Parse ``?ordering=[-]field``; returns ``(field, descending)``"""
+    ordering = request.query_params.get('ordering', default)
+    field = ordering.lstrip('-')
+    if field not in ORDERING_FIELDS:
+        raise ValidationError({'ordering': f'Must be one of {", ".join(ORDERING_FIELDS)}, optionally prefixed with "-"'})
+    return field, ordering.startswith('-')
+
+
+def encode_cursor(value, pk):
+    """Opaque cursor for the row after ``(value, pk)``; see ``RowKeysetPagination``"""
+    return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+
+
+def order_queryset(queryset, field, descending):
+    """Order by ``field`` (NULLs last) with ``id`` as the tie-breaker"""
+    if field == 'id':
+        return queryset.order_by('-id' if descending else 'id')
+    expression = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+    return queryset.order_by(expression, '-id' if descending else 'id')
+
+
+class RowOffsetPagination(LimitOffsetPagination):
+    default_limit = 100
+    max_limit = 1000
+
+
+class RowKeysetPagination(BasePagination):
+    """Keyset pagination over ``(ordering field, id)`` with an opaque cursor"""
+
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = 100
+    max_limit = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.field, self.descending = get_ordering(request)
+        try:
+            self.limit = min(int(request.query_params.get(self.limit_query_param, self.default_limit)),
+                             self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer'})
+        if self.limit < 1:
+            raise ValidationError({'limit': 'Must be positive'})
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(*self.decode_cursor(cursor)))
+        queryset = order_queryset(queryset, self.field, self.descending)
+
+        rows = list(queryset[:self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def _after(self, value, pk):
+        """Rows strictly after ``(value, pk)`` in the current ordering"""
+        if self.field == 'id':
+            return Q(id__lt=pk) if self.descending else Q(id__gt=pk)
+        field, op = self.field, 'lt' if self.descending else 'gt'
+        if value is None:
+            # NULLs sort last, so only the remaining NULL rows follow
+            return Q(**{f'{field}__isnull': True, f'id__{op}': pk})
+        return (
+            Q(**{f'{field}__{op}': value})
+            | Q(**{field: value, f'id__{op}': pk})
+            | Q(**{f'{field}__isnull': True})
+        )
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            return value, int(pk)
+        except (ValueError, TypeError):
+            raise ValidationError({'cursor': 'Invalid cursor'})
+
+    def encode_cursor(self, row):
+        return encode_cursor(getattr(row, self.field), row.id)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
@@ -1,6 +1,41 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Dataset, EquipmentRecord
+from django.urls import reverse
+from .models import Dataset, EquipmentRecord, Job, UploadSession
+
+
+def split_param(value):
+    return {name.strip() for name in value.split(',') if name.strip()} if value else None
+
+
+class DynamicFieldsMixin:
+    """Restrict serialized fields with ``?fields=a,b`` and ``?exclude=a,b``.
+
+    Fields listed in ``Meta.optional_fields`` are left out unless they are
+    named in ``?fields=``; fields passed as ``exclude=`` are always left out.
+    """
+
+    @classmethod
+    def requested_fields(cls, request):
+        fields = set(cls.Meta.fields)
+        optional = set(getattr(cls.Meta, 'optional_fields', []))
+        if request is None:
+            return fields - optional
+        only = split_param(request.query_params.get('fields'))
+        exclude = split_param(request.query_params.get('exclude'))
+        if only is not None:
+            fields &= only
+        else:
+            fields -= optional
+        if exclude is not None:
+            fields -= exclude
+        return fields
+
+    def __init__(self, *args, exclude=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.requested_fields(self.context.get('request')) - set(exclude)
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -15,28 +50,64 @@ class EquipmentRecordSerializer(serializers.ModelSerializer):
         fields = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
 
 
-class DatasetSerializer(serializers.ModelSerializer):
+class DatasetSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    record_count = serializers.IntegerField(source='row_count', read_only=True)
+    data = serializers.SerializerMethodField()
     records = EquipmentRecordSerializer(many=True, read_only=True)
     summary = serializers.SerializerMethodField()
     
     class Meta:
         model = Dataset
-        fields = ['id', 'user', 'filename', 'uploaded_at', 'data', 'records', 'summary']
+        fields = ['id', 'user', 'filename', 'uploaded_at', 'record_count', 'data', 'records', 'summary']
         read_only_fields = ['user', 'uploaded_at']
+        # Duplicates ``data`` row for row, so only sent when asked for
+        optional_fields = ['records']
     
+    def get_data(self, obj):
+        return obj.get_rows()
+
     def get_summary(self, obj):
         return obj.get_summary()
 
 
-class DatasetListSerializer(serializers.ModelSerializer):
+class DatasetListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Lightweight serializer for listing datasets"""
     user = UserSerializer(read_only=True)
-    record_count = serializers.SerializerMethodField()
+    record_count = serializers.IntegerField(source='row_count', read_only=True)
     
     class Meta:
         model = Dataset
         fields = ['id', 'user', 'filename', 'uploaded_at', 'record_count']
-    
-    def get_record_count(self, obj):
-        return len(obj.data) if obj.data else 0
+        # Columns needed to serialize; everything else can stay unloaded
+        only_fields = ['id', 'filename', 'uploaded_at', 'row_count',
+                       'user__id', 'user__username', 'user__email']
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """Status of a queued PDF report; ``download_url`` is set once it is done"""
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'dataset', 'mode', 'status', 'error', 'created_at', 'started_at', 'finished_at',
+                  'download_url']
+
+    def get_download_url(self, obj):
+        if obj.status != Job.DONE:
+            return None
+        url = reverse('dataset-pdf', args=[obj.dataset_id])
+        if obj.mode != 'summary':
+            url += f'?mode={obj.mode}'
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """A resumable upload; PUT the bytes from ``offset`` on, finalize, then poll until it is complete"""
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'offset', 'status', 'dataset', 'error', 'created_at', 'updated_at']
+        read_only_fields = ['offset', 'status', 'dataset', 'error']
+        extra_kwargs = {'size': {'min_value': 0}}
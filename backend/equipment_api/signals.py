@@ -0,0 +1,19 @@
+"""
+Cache invalidation on dataset deletion.
+
+Connected in ``EquipmentApiConfig.ready()``, so cached responses and
+reports are dropped however a dataset goes away: the API, the admin,
+``cleanup_old_datasets`` or a cascade from its user.
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import cache, reports
+from .models import Dataset
+
+
+@receiver(post_delete, sender=Dataset, dispatch_uid='equipment_api.forget_dataset')
+def forget_dataset(sender, instance, **kwargs):
+    """Drop cached responses and reports of a deleted dataset"""
+    cache.invalidate_dataset(instance.id)
+    reports.invalidate(instance.id)
@@ -0,0 +1,240 @@
+"""
+Mergeable streaming statistics accumulators.
+
+``RunningStats`` keeps Welford-style running moments (count, mean, M2)
+plus min/max for one column. Values can be added one at a time or as a
+NumPy batch, and two accumulators can be merged exactly (Chan et al.),
+which is what lets per-chunk results from parallel parsers, or a stored
+summary and newly appended rows, be combined without revisiting data.
+"""
+import math
+
+import numpy as np
+
+from .columnar import NUMERIC_COLUMNS, TYPE_COLUMN, parse_number
+
+
+class RunningStats:
+    """Running count/mean/M2/min/max for one numeric column"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=math.inf, max=-math.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def add(self, value):
+        """Add one value; NaN (a missing cell) is ignored"""
+        if value != value:
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def add_many(self, values):
+        """Add a batch of values in vectorized form"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size:
+            mean = float(values.mean())
+            self.merge(RunningStats(
+                count=int(values.size),
+                mean=mean,
+                m2=float(np.square(values - mean).sum()),
+                min=float(values.min()),
+                max=float(values.max()),
+            ))
+
+    def merge(self, other):
+        """Fold ``other`` into this accumulator"""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def as_dict(self):
+        if not self.count:
+            return {'count': 0, 'average': 0, 'min': 0, 'max': 0, 'std': 0}
+        return {
+            'count': self.count,
+            'average': self.mean,
+            'min': self.min,
+            'max': self.max,
+            'std': self.std,
+        }
+
+    @classmethod
+    def from_dict(cls, stats):
+        """Rebuild an accumulator from ``as_dict()`` output (e.g. a stored summary)"""
+        count = stats.get('count', 0)
+        if not count:
+            return cls()
+        return cls(
+            count=count,
+            mean=stats['average'],
+            m2=stats['std'] ** 2 * count,
+            min=stats['min'],
+            max=stats['max'],
+        )
+
+
+class SummaryAccumulator:
+    """Row count, type counts and per-column ``RunningStats`` for a dataset"""
+
+    def __init__(self):
+        self.total_count = 0
+        self.type_counts = {}
+        self.columns = {name: RunningStats() for name in NUMERIC_COLUMNS}
+
+    def add(self, row):
+        """Add one CSV row (a dict of strings)"""
+        self.total_count += 1
+        eq_type = row.get(TYPE_COLUMN, 'Unknown')
+        self.type_counts[eq_type] = self.type_counts.get(eq_type, 0) + 1
+        for name, column in self.columns.items():
+            column.add(parse_number(row.get(name)))
+
+    def add_columns(self, columns, start=0, stop=None):
+        """Add rows ``start:stop`` of a ``Columns`` object in vectorized form"""
+        stop = len(columns) if stop is None else stop
+        if stop <= start:
+            return
+        self.total_count += stop - start
+        codes = np.asarray(columns.type_codes[start:stop], dtype=np.int64)
+        counts = np.bincount(codes, minlength=len(columns.type_labels))
+        for label, count in zip(columns.type_labels, counts.tolist()):
+            if count:
+                self.type_counts[label] = self.type_counts.get(label, 0) + count
+        for name, column in self.columns.items():
+            column.add_many(columns.numeric[name][start:stop])
+
+    def merge(self, other):
+        self.total_count += other.total_count
+        for label, count in other.type_counts.items():
+            self.type_counts[label] = self.type_counts.get(label, 0) + count
+        for name, column in self.columns.items():
+            column.merge(other.columns[name])
+        return self
+
+    def as_summary(self):
+        return {
+            'total_count': self.total_count,
+            'equipment_types': dict(self.type_counts),
+            'statistics': {
+                name.lower(): column.as_dict()
+                for name, column in self.columns.items()
+            },
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        accumulator = cls()
+        accumulator.add_columns(columns)
+        return accumulator
+
+    @classmethod
+    def from_summary(cls, summary):
+        """Rebuild an accumulator from a stored summary, to extend it with new rows"""
+        accumulator = cls()
+        if not summary:
+            return accumulator
+        accumulator.total_count = summary['total_count']
+        accumulator.type_counts = dict(summary['equipment_types'])
+        for name in NUMERIC_COLUMNS:
+            accumulator.columns[name] = RunningStats.from_dict(summary['statistics'][name.lower()])
+        return accumulator
+
+
+class GroupedAccumulator:
+    """Per equipment type row count and ``RunningStats`` for each numeric column"""
+
+    def __init__(self):
+        self.groups = {}
+
+    def _group(self, label):
+        group = self.groups.get(label)
+        if group is None:
+            group = self.groups[label] = SummaryAccumulator()
+        return group
+
+    def add(self, row):
+        self._group(row.get(TYPE_COLUMN, 'Unknown')).add(row)
+
+    def add_columns(self, columns, start=0, stop=None):
+        """Add rows ``start:stop`` of a ``Columns`` object, grouped in one vectorized pass"""
+        stop = len(columns) if stop is None else stop
+        if stop <= start:
+            return
+        codes = np.asarray(columns.type_codes[start:stop], dtype=np.int64)
+        groups = len(columns.type_labels)
+        row_counts = np.bincount(codes, minlength=groups)
+        batches = [SummaryAccumulator() for _ in range(groups)]
+        for batch, count in zip(batches, row_counts.tolist()):
+            batch.total_count = count
+
+        for name in NUMERIC_COLUMNS:
+            values = np.asarray(columns.numeric[name][start:stop], dtype=np.float64)
+            present = ~np.isnan(values)
+            group_codes, values = codes[present], values[present]
+            counts = np.bincount(group_codes, minlength=groups)
+            sums = np.bincount(group_codes, weights=values, minlength=groups)
+            means = np.divide(sums, counts, out=np.zeros(groups), where=counts > 0)
+            m2 = np.bincount(group_codes, weights=np.square(values - means[group_codes]), minlength=groups)
+            mins = np.full(groups, np.inf)
+            maxs = np.full(groups, -np.inf)
+            np.minimum.at(mins, group_codes, values)
+            np.maximum.at(maxs, group_codes, values)
+            for code, batch in enumerate(batches):
+                batch.columns[name] = RunningStats(
+                    int(counts[code]), float(means[code]), float(m2[code]),
+                    float(mins[code]), float(maxs[code]),
+                )
+
+        for label, batch in zip(columns.type_labels, batches):
+            if batch.total_count:
+                batch.type_counts = {label: batch.total_count}
+                self._group(label).merge(batch)
+
+    def merge(self, other):
+        for label, group in other.groups.items():
+            self._group(label).merge(group)
+        return self
+
+    def as_dict(self):
+        result = {}
+        for label, group in self.groups.items():
+            summary = group.as_summary()
+            result[label] = {'count': summary['total_count'], 'statistics': summary['statistics']}
+        return result
+
+    @classmethod
+    def from_columns(cls, columns):
+        accumulator = cls()
+        accumulator.add_columns(columns)
+        return accumulator
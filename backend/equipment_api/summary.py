@@ -0,0 +1,91 @@
+"""
+Vectorized summary statistics for dataset columns.
+
+Each numeric column is converted to a NumPy array once and all of its
+statistics are computed from that array without Python-level loops:
+moments via ``stats.RunningStats.add_many``, percentiles and a fixed-bin
+histogram from a single sort.
+"""
+import numpy as np
+
+from .columnar import NUMERIC_COLUMNS
+from .sketches import KLLSketch
+from .stats import SummaryAccumulator
+
+
+PERCENTILES = (5, 25, 50, 75, 95)
+HISTOGRAM_BINS = 20
+
+
+def as_float_array(values):
+    """View a column as a float64 NumPy array (no copy for array('d'))"""
+    return np.asarray(values, dtype=np.float64)
+
+
+def empty_distribution():
+    stats = {f'p{p}': 0 for p in PERCENTILES}
+    stats['histogram'] = {'edges': [], 'counts': []}
+    return stats
+
+
+def percentiles(sorted_values, qs=PERCENTILES):
+    """Linear-interpolated percentiles of an already sorted array"""
+    position = np.asarray(qs, dtype=np.float64) / 100 * (sorted_values.size - 1)
+    lower = np.floor(position).astype(np.intp)
+    upper = np.minimum(lower + 1, sorted_values.size - 1)
+    fraction = position - lower
+    return sorted_values[lower] * (1 - fraction) + sorted_values[upper] * fraction
+
+
+def histogram(sorted_values, bins=HISTOGRAM_BINS):
+    """Fixed-bin histogram of an already sorted array (``np.histogram`` bins)"""
+    low, high = float(sorted_values[0]), float(sorted_values[-1])
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, bins + 1)
+    # Bins are half-open [a, b) except the last, which includes the maximum
+    bounds = np.searchsorted(sorted_values, edges[1:-1], side='left')
+    counts = np.diff(np.concatenate(([0], bounds, [sorted_values.size])))
+    return counts, edges
+
+
+def column_distribution(values, bins=HISTOGRAM_BINS):
+    """Percentiles and histogram for one numeric column; NaN marks a missing value.
+
+    The present values are sorted once and both are read off the sorted
+    array.
+    """
+    values = as_float_array(values)
+    present = np.sort(values[~np.isnan(values)])
+    if not present.size:
+        return empty_distribution()
+
+    stats = {f'p{p}': float(value) for p, value in zip(PERCENTILES, percentiles(present))}
+    counts, edges = histogram(present, bins)
+    stats['histogram'] = {'edges': edges.tolist(), 'counts': counts.tolist()}
+    return stats
+
+
+def compute_summary(columns, accumulator=None):
+    """Summary dict for ``Columns``, as returned by ``Dataset.get_summary``.
+
+    Counts and moments come from a ``SummaryAccumulator``; pass the one
+    built while streaming the upload to avoid recomputing them. Percentiles
+    and histograms are always computed from the full columns.
+    """
+    if not len(columns):
+        return {}
+    if accumulator is None:
+        accumulator = SummaryAccumulator.from_columns(columns)
+    summary = accumulator.as_summary()
+    for name in NUMERIC_COLUMNS:
+        summary['statistics'][name.lower()].update(column_distribution(columns.numeric[name]))
+    return summary
+
+
+def build_sketches(columns):
+    """``KLLSketch`` state per numeric column, for ``Dataset.quantile_sketches``"""
+    return {
+        name.lower(): KLLSketch().update(columns.numeric[name]).to_dict()
+        for name in NUMERIC_COLUMNS
+    }
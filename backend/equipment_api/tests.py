@@ -0,0 +1,1004 @@
+import csv
+import gzip
+import io
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import charts, reports
+from .columnar import NUMERIC_COLUMNS, Columns, format_number
+from .export import read_npz
+from .ingest import ingest_csv, ingest_csv_parallel
+from .jobs import claim_job, claim_jobs, dispatch, requeue_stale, run_job
+from .models import Dataset, EquipmentRecord, Job, WorkerHeartbeat
+from .sketches import KLLSketch
+from .stats import GroupedAccumulator, RunningStats, SummaryAccumulator
+
+HEADER = 'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+TYPES = ['Pump', 'Valve', 'Reactor', 'Compressor', 'Heat Exchanger']
+
+
+def make_csv(rows=3000, seed=0):
+    """Equipment CSV with a few missing pressures, as bytes"""
+    rng = np.random.default_rng(seed)
+    lines = [HEADER]
+    for i in range(rows):
+        pressure = '' if i % 17 == 0 else f'{rng.uniform(1, 10):.3f}'
+        lines.append(
+            f'{TYPES[i % len(TYPES)]}-{i},{TYPES[(i * 7) % len(TYPES)]},'
+            f'{rng.uniform(50, 300):.2f},{pressure},{rng.normal(100, 20):.1f}\n'
+        )
+    return ''.join(lines).encode()
+
+
+def csv_file(content, name='equipment.csv'):
+    return SimpleUploadedFile(name, content, content_type='text/csv')
+
+
+def temporary_report_dir(test):
+    """Point ``REPORT_CACHE_DIR`` at a new directory for the rest of ``test``; returns its path"""
+    report_dir = Path(tempfile.mkdtemp())
+    test.addCleanup(shutil.rmtree, report_dir, ignore_errors=True)
+    settings_override = override_settings(REPORT_CACHE_DIR=str(report_dir))
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+    return report_dir
+
+
+def legacy_summary(rows):
+    """Summary as computed by Dataset.get_summary before it was stored (the reference)"""
+    def std_dev(values):
+        if not values:
+            return 0
+        mean = sum(values) / len(values)
+        return (sum((x - mean) ** 2 for x in values) / len(values)) ** 0.5
+
+    type_counts = {}
+    for row in rows:
+        eq_type = row.get('Type', 'Unknown')
+        type_counts[eq_type] = type_counts.get(eq_type, 0) + 1
+
+    statistics = {}
+    for column in NUMERIC_COLUMNS:
+        values = [float(row[column]) for row in rows if row.get(column)]
+        statistics[column.lower()] = {
+            'average': sum(values) / len(values) if values else 0,
+            'min': min(values) if values else 0,
+            'max': max(values) if values else 0,
+            'std': std_dev(values),
+        }
+    return {'total_count': len(rows), 'equipment_types': type_counts, 'statistics': statistics}
+
+
+class DatasetTestCase(TestCase):
+    """Starts each test with an empty response cache.
+
+    Dataset ids are reused once a test's transaction is rolled back, so
+    responses cached by an earlier test could otherwise be served.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+
+class SummaryTests(DatasetTestCase):
+    def test_summary_matches_legacy_computation(self):
+        content = make_csv(2000, seed=1)
+        result = ingest_csv(csv_file(content), chunk_size=1024, workers=1)
+        dataset = Dataset()
+        result.writer.store(dataset)
+        rows = [
+            {key: '' if value is None else str(value) for key, value in row.items()}
+            for row in dataset.iter_rows()
+        ]
+        expected = legacy_summary(rows)
+
+        for summary in (result.summary, dataset.compute_summary()):
+            self.assertEqual(summary['total_count'], expected['total_count'])
+            self.assertEqual(summary['equipment_types'], expected['equipment_types'])
+            for column, stats in expected['statistics'].items():
+                for key, value in stats.items():
+                    self.assertTrue(
+                        math.isclose(summary['statistics'][column][key], value, rel_tol=1e-9, abs_tol=1e-9),
+                        f'{column} {key}: {summary["statistics"][column][key]} != {value}',
+                    )
+
+    def test_summary_is_stored_at_upload(self):
+        response = APIClient().post('/api/datasets/', {'file': csv_file(make_csv(50))}, format='multipart')
+        dataset = Dataset.objects.get(pk=response.data['id'])
+        self.assertEqual(dataset.summary_version, Dataset.SUMMARY_VERSION)
+        self.assertEqual(dataset.summary['total_count'], 50)
+        self.assertEqual(response.data['summary'], dataset.summary)
+
+    def test_stale_summary_is_recomputed_on_access(self):
+        response = APIClient().post('/api/datasets/', {'file': csv_file(make_csv(50))}, format='multipart')
+        stored = Dataset.objects.get(pk=response.data['id']).summary
+        Dataset.objects.filter(pk=response.data['id']).update(summary={'stale': True}, summary_version=0)
+
+        dataset = Dataset.objects.get(pk=response.data['id'])
+        self.assertEqual(dataset.get_summary(), stored)
+        dataset.refresh_from_db()
+        self.assertEqual((dataset.summary, dataset.summary_version), (stored, Dataset.SUMMARY_VERSION))
+
+
+class UploadTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_upload_returns_dataset_without_rows(self):
+        response = self.client.post('/api/datasets/', {'file': csv_file(make_csv(300))}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['record_count'], 300)
+        self.assertEqual(response.data['summary']['total_count'], 300)
+        self.assertNotIn('data', response.data)
+
+    def test_empty_csv_is_rejected(self):
+        response = self.client.post('/api/datasets/', {'file': csv_file(HEADER.encode())}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Dataset.objects.count(), 0)
+
+    def test_chunk_boundaries_do_not_change_rows(self):
+        content = b'\xef\xbb\xbf' + make_csv(400).replace(b'\n', b'\r\n')
+        whole = ingest_csv(csv_file(content), chunk_size=len(content), workers=1)
+        for chunk_size in (1, 7, 4096):
+            with self.subTest(chunk_size=chunk_size):
+                result = ingest_csv(csv_file(content), chunk_size=chunk_size, workers=1)
+                self.assertEqual(result.content_hash, whole.content_hash)
+                self.assertEqual(list(result.columns.iter_rows()), list(whole.columns.iter_rows()))
+        self.assertEqual(whole.columns.names[0], 'Pump-0')
+
+    def test_only_the_five_most_recent_datasets_are_kept(self):
+        ids = [
+            self.client.post('/api/datasets/', {'file': csv_file(make_csv(5, seed=i))}, format='multipart').data['id']
+            for i in range(7)
+        ]
+        self.assertEqual(sorted(Dataset.objects.values_list('id', flat=True)), sorted(ids[-5:]))
+
+
+class IngestTests(SimpleTestCase):
+    def test_parallel_ingest_matches_serial(self):
+        content = make_csv(5000)
+        serial = ingest_csv(csv_file(content), chunk_size=4096, workers=1)
+        parallel = ingest_csv_parallel(csv_file(content), 3)
+
+        self.assertIsNotNone(parallel)
+        self.assertEqual(parallel.content_hash, serial.content_hash)
+        self.assertEqual(parallel.row_count, serial.row_count)
+        self.assertEqual(parallel.columns.names, serial.columns.names)
+        self.assertEqual(list(parallel.columns.type_labels), list(serial.columns.type_labels))
+        self.assertEqual(list(parallel.columns.type_codes), list(serial.columns.type_codes))
+        for name in NUMERIC_COLUMNS:
+            np.testing.assert_array_equal(
+                np.asarray(parallel.columns.numeric[name]), np.asarray(serial.columns.numeric[name]))
+        self.assertEqual(parallel.summary['total_count'], serial.summary['total_count'])
+        self.assertEqual(parallel.summary['equipment_types'], serial.summary['equipment_types'])
+        for column, stats in serial.summary['statistics'].items():
+            for key in ('average', 'min', 'max', 'std'):
+                self.assertAlmostEqual(parallel.summary['statistics'][column][key], stats[key], places=9)
+        self.assertEqual(list(parallel.type_summary), list(serial.type_summary))
+
+    def test_parallel_ingest_declines_quoted_fields(self):
+        content = (HEADER + '"Pump, main",Pump,1,2,3\n').encode()
+        self.assertIsNone(ingest_csv_parallel(csv_file(content), 2))
+
+    def test_gzip_upload_matches_plain(self):
+        content = make_csv(500)
+        plain = ingest_csv(csv_file(content), workers=1)
+        compressed = ingest_csv(csv_file(gzip.compress(content), 'equipment.csv.gz'), workers=1)
+        self.assertEqual(compressed.content_hash, plain.content_hash)
+        self.assertEqual(compressed.columns.names, plain.columns.names)
+
+    def test_truncated_gzip_is_rejected(self):
+        compressed = gzip.compress(make_csv(500))
+        for cut in (len(compressed) // 2, len(compressed) - 4):
+            with self.subTest(cut=cut), self.assertRaisesMessage(ValueError, 'truncated'):
+                ingest_csv(csv_file(compressed[:cut], 'equipment.csv.gz'), workers=1)
+
+
+@override_settings(JOB_FALLBACK='inline')
+class UploadSessionTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, ignore_errors=True)
+        settings_override = override_settings(UPLOAD_SESSION_DIR=self.upload_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        self.content = make_csv(200)
+        response = self.client.post('/api/uploads/', {'filename': 'equipment.csv', 'size': len(self.content)},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.url = f'/api/uploads/{response.data["id"]}/'
+
+    def put(self, start, end, total=None):
+        total = len(self.content) if total is None else total
+        return self.client.put(self.url, self.content[start:end + 1], content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{total}')
+
+    def test_ranges_must_continue_from_offset(self):
+        self.assertEqual(self.put(0, 99).data['offset'], 100)
+
+        response = self.put(50, 149)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 100)
+        response = self.put(200, 299)
+        self.assertEqual(response.status_code, 409)
+
+        self.assertEqual(self.client.get(self.url).data['offset'], 100)
+        self.assertEqual(self.put(100, 199).data['offset'], 200)
+
+    def test_invalid_ranges_are_rejected(self):
+        size = len(self.content)
+        self.assertEqual(self.put(0, size).status_code, 416)
+        self.assertEqual(self.put(0, 9, total=size + 1).status_code, 416)
+        self.assertEqual(self.put(10, 5).status_code, 416)
+        response = self.client.put(self.url, self.content, content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.put(self.url, self.content, content_type='application/octet-stream',
+                                   HTTP_CONTENT_RANGE='bytes 0-9')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(self.url).data['offset'], 0)
+
+    def test_finalize_requires_every_byte(self):
+        self.put(0, 99)
+        response = self.client.post(f'{self.url}finalize/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 100)
+
+        self.put(100, len(self.content) - 1)
+        response = self.client.post(f'{self.url}finalize/')
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response['Location'].endswith(self.url))
+        self.assertEqual(response.data['status'], 'complete')
+        dataset = Dataset.objects.get(pk=response.data['dataset'])
+        self.assertEqual(dataset.row_count, 200)
+        self.assertFalse(os.path.exists(os.path.join(self.upload_dir, f'{response.data["id"]}.part')))
+
+        self.assertEqual(self.client.post(f'{self.url}finalize/').status_code, 409)
+        self.assertEqual(self.put(0, 9).status_code, 409)
+
+    @override_settings(JOB_FALLBACK='none')
+    def test_finalize_queues_ingestion(self):
+        self.put(0, len(self.content) - 1)
+        response = self.client.post(f'{self.url}finalize/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'ingesting')
+        self.assertEqual(self.client.post(f'{self.url}finalize/').status_code, 409)
+        self.assertEqual(Dataset.objects.count(), 0)
+
+        job_ids = claim_jobs(5)
+        self.assertEqual(Job.objects.get(pk=job_ids[0]).kind, Job.INGEST)
+        for job_id in job_ids:
+            run_job(job_id)
+        upload = self.client.get(self.url).data
+        self.assertEqual(upload['status'], 'complete')
+        self.assertEqual(Dataset.objects.get(pk=upload['dataset']).row_count, 200)
+
+    def test_failed_ingestion_is_reported(self):
+        self.content = HEADER.encode()
+        response = self.client.post('/api/uploads/', {'filename': 'empty.csv', 'size': len(self.content)},
+                                    format='json')
+        self.url = f'/api/uploads/{response.data["id"]}/'
+        self.put(0, len(self.content) - 1)
+        self.assertEqual(self.client.post(f'{self.url}finalize/').status_code, 202)
+        upload = self.client.get(self.url).data
+        self.assertEqual(upload['status'], 'failed')
+        self.assertEqual(upload['error'], 'Empty CSV file')
+        self.assertIsNone(upload['dataset'])
+        self.assertEqual(Job.objects.get(upload_id=upload['id']).status, Job.FAILED)
+
+
+class ColumnarStorageTests(TestCase):
+    def test_rows_round_trip_through_blobs(self):
+        rows = [
+            {'Equipment Name': 'Pump-1', 'Type': 'Pump', 'Flowrate': '120', 'Pressure': '5.2', 'Temperature': '110'},
+            {'Equipment Name': 'Valvé-2', 'Type': 'Valve', 'Flowrate': '60.5', 'Pressure': '', 'Temperature': '-3'},
+        ]
+        dataset = Dataset.objects.create(filename='rows.csv')
+        dataset.set_columns(Columns.from_rows(rows))
+        dataset.save()
+
+        stored = Dataset.objects.get(pk=dataset.pk)
+        self.assertTrue(stored.is_columnar)
+        self.assertIsNone(stored.data)
+        self.assertEqual(stored.row_count, 2)
+        self.assertEqual(stored.get_rows(), rows)
+
+    def test_numbers_are_spelled_canonically(self):
+        cells = {'5.20': '5.2', '007': '7', '1e3': '1000', '-0': '0', '0.1': '0.1', '2.5e-07': '2.5e-07'}
+        for text, expected in cells.items():
+            with self.subTest(text=text):
+                self.assertEqual(format_number(float(text)), expected)
+        self.assertEqual(format_number(math.nan), '')
+
+
+class RecordJobTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def upload(self, rows=120):
+        return self.client.post('/api/datasets/', {'file': csv_file(make_csv(rows))}, format='multipart').data['id']
+
+    @override_settings(JOB_FALLBACK='none')
+    def test_rows_wait_for_the_records_job(self):
+        dataset_id = self.upload()
+        for _ in range(2):
+            response = self.client.get(f'/api/datasets/{dataset_id}/rows/')
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('Retry-After', response)
+        self.assertEqual(Job.objects.filter(kind=Job.RECORDS, dataset_id=dataset_id).count(), 1)
+
+        for job_id in claim_jobs(5):
+            run_job(job_id)
+        response = self.client.get(f'/api/datasets/{dataset_id}/rows/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 120)
+
+    @override_settings(JOB_FALLBACK='inline')
+    def test_records_are_written_once(self):
+        dataset_id = self.upload()
+        dataset = Dataset.objects.get(pk=dataset_id)
+        self.assertTrue(dataset.records_written)
+        self.assertEqual(EquipmentRecord.objects.filter(dataset=dataset).count(), 120)
+
+        self.assertFalse(dataset.write_records())
+        self.assertTrue(dataset.write_records(rewrite=True))
+        self.assertEqual(EquipmentRecord.objects.filter(dataset=dataset).count(), 120)
+
+    @override_settings(JOB_FALLBACK='inline')
+    def test_records_can_be_requested_with_the_detail(self):
+        dataset_id = self.upload(30)
+        response = self.client.get(f'/api/datasets/{dataset_id}/', {'fields': 'id,records'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['records']), 30)
+
+
+class BackfillTests(DatasetTestCase):
+    ROWS = [
+        {'Equipment Name': 'Pump-1', 'Type': 'Pump', 'Flowrate': '120', 'Pressure': '5.2', 'Temperature': '110'},
+        {'Equipment Name': 'Valve-2', 'Type': 'Valve', 'Flowrate': '60.5', 'Pressure': '', 'Temperature': '95'},
+        {'Equipment Name': 'Pump-3', 'Type': 'Pump', 'Flowrate': '130', 'Pressure': '6', 'Temperature': '120'},
+    ]
+
+    def backfill(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('backfill_datasets', checkpoint=str(Path(directory) / 'checkpoint.json'), stdout=StringIO())
+
+    def test_legacy_dataset_is_converted(self):
+        dataset = Dataset.objects.create(filename='legacy.csv', data=self.ROWS)
+        self.backfill()
+
+        dataset = Dataset.objects.get(pk=dataset.pk)
+        self.assertTrue(dataset.is_columnar)
+        self.assertEqual(dataset.row_count, 3)
+        self.assertEqual(dataset.summary['total_count'], 3)
+        self.assertEqual(dataset.summary['equipment_types'], {'Pump': 2, 'Valve': 1})
+        self.assertTrue(dataset.content_hash)
+        self.assertTrue(dataset.records_written)
+        self.assertEqual(dataset.records.count(), 3)
+
+    def test_row_count_is_fixed_on_columnar_datasets(self):
+        dataset = Dataset.objects.create(filename='rows.csv')
+        dataset.set_columns(Columns.from_rows(self.ROWS))
+        dataset.save()
+        dataset.write_records()
+        Dataset.objects.filter(pk=dataset.pk).update(row_count=0)
+
+        self.backfill()
+        self.assertEqual(Dataset.objects.get(pk=dataset.pk).row_count, 3)
+
+    def test_cached_responses_are_invalidated(self):
+        dataset = Dataset.objects.create(filename='legacy.csv', data=self.ROWS)
+        client = APIClient()
+        self.assertEqual(client.get(f'/api/datasets/{dataset.pk}/', {'exclude': 'data'}).data['record_count'], 0)
+        self.assertEqual(client.get(f'/api/datasets/{dataset.pk}/', {'exclude': 'data'})['X-Cache'], 'HIT')
+
+        self.backfill()
+        response = client.get(f'/api/datasets/{dataset.pk}/', {'exclude': 'data'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['record_count'], 3)
+
+
+class AccumulatorTests(TestCase):
+    def assertStatsClose(self, stats, values):
+        values = np.asarray(values)
+        self.assertEqual(stats.count, values.size)
+        self.assertTrue(math.isclose(stats.mean, values.mean(), rel_tol=1e-12))
+        self.assertTrue(math.isclose(stats.std, values.std(), rel_tol=1e-9))
+        self.assertEqual((stats.min, stats.max), (values.min(), values.max()))
+
+    def test_welford_merge_matches_numpy(self):
+        values = np.random.default_rng(3).normal(1e6, 5, 10_001)
+        one_by_one = RunningStats()
+        for value in values[:1000]:
+            one_by_one.add(value)
+        self.assertStatsClose(one_by_one, values[:1000])
+
+        merged = RunningStats()
+        for chunk in np.array_split(values, 7):
+            part = RunningStats()
+            part.add_many(chunk)
+            merged.merge(part)
+        self.assertStatsClose(merged, values)
+
+    def test_missing_values_are_skipped(self):
+        stats = RunningStats()
+        stats.add_many([1.0, math.nan, 3.0])
+        stats.add(math.nan)
+        self.assertStatsClose(stats, [1.0, 3.0])
+        self.assertEqual(RunningStats().merge(RunningStats()).as_dict()['count'], 0)
+
+    def test_stored_summary_extends_with_new_rows(self):
+        columns = ingest_csv(csv_file(make_csv(900, seed=4)), workers=1).columns
+        whole = SummaryAccumulator.from_columns(columns).as_summary()
+
+        head = SummaryAccumulator()
+        head.add_columns(columns, 0, 500)
+        extended = SummaryAccumulator.from_summary(head.as_summary())
+        extended.add_columns(columns, 500)
+        summary = extended.as_summary()
+
+        self.assertEqual(summary['total_count'], whole['total_count'])
+        self.assertEqual(summary['equipment_types'], whole['equipment_types'])
+        for column, stats in whole['statistics'].items():
+            for key, value in stats.items():
+                self.assertTrue(math.isclose(summary['statistics'][column][key], value, rel_tol=1e-9),
+                                f'{column} {key}')
+
+    def test_grouped_accumulator_matches_rows_added_one_by_one(self):
+        columns = ingest_csv(csv_file(make_csv(600, seed=5)), workers=1).columns
+        by_row = GroupedAccumulator()
+        for row in columns.iter_rows():
+            by_row.add({key: '' if value is None else str(value) for key, value in row.items()})
+        tail = GroupedAccumulator()
+        tail.add_columns(columns, 250)
+        vectorized = GroupedAccumulator()
+        vectorized.add_columns(columns, 0, 250)
+        vectorized.merge(tail)
+
+        expected, actual = by_row.as_dict(), vectorized.as_dict()
+        self.assertEqual(actual.keys(), expected.keys())
+        for label, group in expected.items():
+            self.assertEqual(actual[label]['count'], group['count'])
+            for column, stats in group['statistics'].items():
+                for key, value in stats.items():
+                    self.assertTrue(math.isclose(actual[label]['statistics'][column][key], value,
+                                                 rel_tol=1e-9, abs_tol=1e-9), f'{label} {column} {key}')
+
+
+class SketchTests(TestCase):
+    QS = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+    def rank_error(self, sketch, values):
+        values = np.sort(values)
+        return max(abs(np.searchsorted(values, x) / values.size - q)
+                   for x, q in zip(sketch.quantiles(self.QS), self.QS))
+
+    def test_rank_error_at_the_ingest_batch_size(self):
+        values = np.random.default_rng(6).normal(100, 20, 300_000)
+        sketch = KLLSketch()
+        for start in range(0, values.size, 8192):
+            sketch.update(values[start:start + 8192])
+        self.assertEqual(len(sketch), values.size)
+        self.assertLess(self.rank_error(sketch, values), 0.015)
+        self.assertLess(sum(level.size for level in sketch.levels), 350)
+
+    def test_merged_and_restored_sketches(self):
+        values = np.random.default_rng(7).uniform(50, 300, 100_000)
+        halves = [KLLSketch().update(half) for half in np.array_split(values, 2)]
+        merged = KLLSketch.from_dict(halves[0].to_dict()).merge(KLLSketch.from_dict(halves[1].to_dict()))
+        self.assertEqual(len(merged), values.size)
+        self.assertEqual((merged.min, merged.max), (values.min(), values.max()))
+        self.assertLess(self.rank_error(merged, values), 0.015)
+        np.testing.assert_array_equal(merged.quantiles(self.QS), KLLSketch.from_dict(merged.to_dict()).quantiles(self.QS))
+
+
+class ByTypeTests(DatasetTestCase):
+    def test_statistics_per_equipment_type(self):
+        content = make_csv(500, seed=8)
+        dataset_id = APIClient().post('/api/datasets/', {'file': csv_file(content)}, format='multipart').data['id']
+        response = APIClient().get(f'/api/datasets/{dataset_id}/by-type/')
+        self.assertEqual(response.status_code, 200)
+
+        rows = [
+            {key: '' if value is None else str(value) for key, value in row.items()}
+            for row in Dataset.objects.get(pk=dataset_id).iter_rows()
+        ]
+        self.assertEqual(set(response.data), set(TYPES))
+        for eq_type, group in response.data.items():
+            expected = legacy_summary([row for row in rows if row['Type'] == eq_type])
+            self.assertEqual(group['count'], expected['total_count'])
+            for column, stats in expected['statistics'].items():
+                for key, value in stats.items():
+                    self.assertTrue(math.isclose(group['statistics'][column][key], value, rel_tol=1e-9),
+                                    f'{eq_type} {column} {key}')
+
+    def test_missing_type_summary_is_computed_and_stored(self):
+        dataset_id = APIClient().post('/api/datasets/', {'file': csv_file(make_csv(50))}, format='multipart').data['id']
+        stored = Dataset.objects.get(pk=dataset_id).type_summary
+        Dataset.objects.filter(pk=dataset_id).update(type_summary=None)
+
+        self.assertEqual(APIClient().get(f'/api/datasets/{dataset_id}/by-type/').data, stored)
+        self.assertEqual(Dataset.objects.get(pk=dataset_id).type_summary, stored)
+
+
+class DatasetListTests(DatasetTestCase):
+    def test_list_leaves_rows_unloaded(self):
+        client = APIClient()
+        for seed in range(6):
+            client.post('/api/datasets/', {'file': csv_file(make_csv(20 + seed, seed=seed))}, format='multipart')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/datasets/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['record_count'] for item in response.data], [25, 24, 23, 22, 21])
+        self.assertEqual(set(response.data[0]), {'id', 'user', 'filename', 'uploaded_at', 'record_count'})
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        for field in [*Dataset.ROW_STORAGE_FIELDS, 'summary']:
+            self.assertNotIn(f'"{field}"', sql)
+
+
+@override_settings(JOB_FALLBACK='inline')
+class RowPaginationTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        response = self.client.post('/api/datasets/', {'file': csv_file(make_csv(300, seed=9))}, format='multipart')
+        self.url = f'/api/datasets/{response.data["id"]}/rows/'
+
+    def walk(self, params):
+        """Every row id, following ``next`` links from the first cursor page"""
+        ids, response = [], self.client.get(self.url, {'pagination': 'cursor', **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_keyset_pages_match_offset_order(self):
+        for ordering in ('id', '-id', 'pressure', '-pressure', 'equipment_type'):
+            with self.subTest(ordering=ordering):
+                offset = self.client.get(self.url, {'ordering': ordering, 'limit': 1000})
+                self.assertEqual(offset.data['count'], 300)
+                expected = [row['id'] for row in offset.data['results']]
+                self.assertEqual(self.walk({'ordering': ordering, 'limit': 37}), expected)
+
+    def test_filters(self):
+        params = {'type': 'Pump,Valve', 'flowrate_min': '100', 'temperature_max': '110'}
+        records = EquipmentRecord.objects.filter(
+            equipment_type__in=['Pump', 'Valve'], flowrate__gte=100, temperature__lte=110)
+        self.assertEqual(self.client.get(self.url, params).data['count'], records.count())
+        self.assertEqual(sorted(self.walk({**params, 'limit': 10})), sorted(records.values_list('id', flat=True)))
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'ordering': 'secret'}, {'flowrate_min': 'high'},
+                       {'pagination': 'cursor', 'cursor': 'nonsense'}, {'pagination': 'cursor', 'limit': '0'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class FieldSelectionTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        response = self.client.post('/api/datasets/', {'file': csv_file(make_csv(40))}, format='multipart')
+        self.url = f'/api/datasets/{response.data["id"]}/'
+
+    def test_fields_and_exclude(self):
+        self.assertEqual(set(self.client.get(self.url, {'fields': 'id,summary'}).data), {'id', 'summary'})
+        default = set(self.client.get(self.url).data)
+        self.assertIn('data', default)
+        self.assertNotIn('records', default)
+        self.assertEqual(set(self.client.get(self.url, {'exclude': 'data,summary'}).data), default - {'data', 'summary'})
+        self.assertEqual(set(self.client.get(self.url, {'fields': 'id,data', 'exclude': 'data'}).data), {'id'})
+
+    def test_unrequested_rows_are_not_loaded(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,filename,record_count'})
+        self.assertEqual(response.data['record_count'], 40)
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        for field in [*Dataset.ROW_STORAGE_FIELDS, 'summary']:
+            self.assertNotIn(f'"{field}"', sql)
+
+    def test_list_fields(self):
+        response = self.client.get('/api/datasets/', {'fields': 'id,record_count'})
+        self.assertEqual([set(item) for item in response.data], [{'id', 'record_count'}])
+
+
+class ConditionalRequestTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        response = self.client.post('/api/datasets/', {'file': csv_file(make_csv(100))}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.url = f'/api/datasets/{response.data["id"]}/'
+
+    def test_detail_and_summary_answer_304_for_current_etag(self):
+        for url in (self.url, f'{self.url}summary/', f'{self.url}chart/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                self.assertIn('Last-Modified', response)
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_representation(self):
+        full = self.client.get(self.url)['ETag']
+        slim = self.client.get(self.url, {'exclude': 'data'})['ETag']
+        self.assertNotEqual(full, slim)
+        response = self.client.get(self.url, {'exclude': 'data'}, HTTP_IF_NONE_MATCH=full)
+        self.assertEqual(response.status_code, 200)
+
+
+class ResponseCacheTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.dataset_id = self.client.post(
+            '/api/datasets/', {'file': csv_file(make_csv(60))}, format='multipart').data['id']
+        self.url = f'/api/datasets/{self.dataset_id}/summary/'
+
+    def test_unknown_query_parameters_share_entries(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        response = self.client.get(self.url, {'_': '1700000000'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response['ETag'], self.client.get(self.url)['ETag'])
+
+        detail = f'/api/datasets/{self.dataset_id}/'
+        self.assertEqual(self.client.get(detail, {'exclude': 'data'})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(detail, {'exclude': 'data,summary'})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(detail, {'exclude': 'data', 'utm_source': 'mail'})['X-Cache'], 'HIT')
+
+    def test_deletes_outside_the_api_invalidate(self):
+        self.assertEqual(self.client.get('/api/datasets/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/datasets/')['X-Cache'], 'HIT')
+        self.client.get(self.url)
+
+        Dataset.objects.filter(pk=self.dataset_id).delete()
+        response = self.client.get('/api/datasets/')
+        self.assertEqual((response['X-Cache'], response.data), ('MISS', []))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_cleanup_old_datasets_invalidates(self):
+        user = User.objects.create_user('engineer')
+        Dataset.objects.filter(pk=self.dataset_id).update(user=user)
+        self.client.get('/api/datasets/')
+        Dataset.cleanup_old_datasets(user, keep_count=0)
+        self.assertEqual(self.client.get('/api/datasets/').data, [])
+
+    def test_cache_is_bounded(self):
+        self.assertEqual(cache._max_entries, settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+class ReportCacheTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.report_dir = temporary_report_dir(self)
+        self.client = APIClient()
+        self.dataset_id = self.client.post(
+            '/api/datasets/', {'file': csv_file(make_csv(30))}, format='multipart').data['id']
+        self.url = f'/api/datasets/{self.dataset_id}/pdf/'
+
+    def download(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_report_is_rendered_once(self):
+        response = self.client.get(self.url)
+        self.assertEqual((response.status_code, response['X-Cache']), (200, 'MISS'))
+        content = self.download(response)
+        self.assertTrue(content.startswith(b'%PDF'))
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(self.download(response), content)
+        self.assertEqual(len(list(self.report_dir.glob('*.pdf'))), 1)
+
+        Dataset.objects.filter(pk=self.dataset_id).delete()
+        self.assertEqual(list(self.report_dir.glob('*.pdf')), [])
+
+    def test_least_recently_used_reports_are_evicted(self):
+        for age, name in enumerate(['new', 'used', 'old']):
+            path = self.report_dir / f'{name}.pdf'
+            path.write_bytes(b'x' * 100)
+            os.utime(path, (1_000_000 - age * 10, 1_000_000 - age * 10))
+        os.utime(self.report_dir / 'used.pdf')
+
+        reports.evict(max_bytes=250)
+        self.assertEqual(sorted(path.name for path in self.report_dir.glob('*.pdf')), ['new.pdf', 'used.pdf'])
+        reports.evict(max_bytes=100)
+        self.assertEqual([path.name for path in self.report_dir.glob('*.pdf')], ['used.pdf'])
+
+
+@override_settings(JOB_FALLBACK='none')
+class JobTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.report_dir = temporary_report_dir(self)
+        self.client = APIClient()
+        self.dataset_id = self.client.post(
+            '/api/datasets/', {'file': csv_file(make_csv(40))}, format='multipart').data['id']
+        self.url = f'/api/datasets/{self.dataset_id}/pdf/jobs/'
+
+    def beat(self, name, dedicated=True, age=0):
+        WorkerHeartbeat.objects.update_or_create(
+            name=name, defaults={'dedicated': dedicated, 'last_seen': timezone.now() - timedelta(seconds=age)})
+
+    def test_worker_renders_queued_report(self):
+        response = self.client.post(self.url, {'mode': 'full'}, format='json')
+        self.assertEqual((response.status_code, response.data['status']), (202, Job.PENDING))
+        self.assertEqual(self.client.post(self.url, {'mode': 'full'}, format='json').data['id'], response.data['id'])
+
+        call_command('report_worker', '--workers', '1', '--once', stdout=StringIO())
+        job = self.client.get(f'{self.url}{response.data["id"]}/').data
+        self.assertEqual(job['status'], Job.DONE)
+        self.assertTrue(job['download_url'].endswith(f'/api/datasets/{self.dataset_id}/pdf/?mode=full'))
+        self.assertEqual(len(list(self.report_dir.glob(f'{self.dataset_id}-full-*.pdf'))), 1)
+        self.assertFalse(WorkerHeartbeat.objects.exists())
+
+    def test_jobs_of_runners_without_heartbeat_are_requeued(self):
+        job_id = self.client.post(self.url).data['id']
+        self.beat('worker:gone', age=settings.WORKER_HEARTBEAT_TIMEOUT + 1)
+        claim_job(job_id, 'worker:gone')
+        self.assertEqual(self.client.get(f'{self.url}{job_id}/').data['status'], Job.PENDING)
+        self.assertFalse(WorkerHeartbeat.objects.exists())
+
+        self.beat('worker:busy')
+        claim_job(job_id, 'worker:busy')
+        self.assertEqual(requeue_stale(), 0)
+        self.assertEqual(Job.objects.get(pk=job_id).status, Job.RUNNING)
+
+    @override_settings(JOB_FALLBACK='thread')
+    def test_web_process_runs_jobs_only_without_a_live_worker(self):
+        job = Job.objects.create(kind=Job.REPORT, dataset_id=self.dataset_id)
+        for name, dedicated, age, started in [
+            ('web:host:1', False, 0, True),
+            ('worker:stale', True, settings.WORKER_HEARTBEAT_TIMEOUT + 1, True),
+            ('worker:alive', True, 0, False),
+        ]:
+            with self.subTest(name=name):
+                self.beat(name, dedicated, age)
+                with self.captureOnCommitCallbacks() as callbacks:
+                    dispatch(job)
+                self.assertEqual(len(callbacks), int(started))
+
+
+@override_settings(JOB_FALLBACK='none')
+class FullReportTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.report_dir = temporary_report_dir(self)
+        self.client = APIClient()
+        self.dataset_id = self.client.post(
+            '/api/datasets/', {'file': csv_file(make_csv(400))}, format='multipart').data['id']
+        self.url = f'/api/datasets/{self.dataset_id}/pdf/'
+
+    def pages(self, response):
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        return len(re.findall(rb'/Type /Page\b(?!s)', content))
+
+    def test_full_report_is_queued_not_rendered_in_the_request(self):
+        response = self.client.get(self.url, {'mode': 'full'})
+        self.assertEqual((response.status_code, response.data['status']), (202, Job.PENDING))
+        self.assertTrue(response['Location'].endswith(f'{self.url}jobs/{response.data["id"]}/'))
+        self.assertEqual(list(self.report_dir.glob('*.pdf')), [])
+        self.assertEqual(self.client.get(self.url, {'mode': 'full'}).data['id'], response.data['id'])
+
+        call_command('report_worker', '--workers', '1', '--once', stdout=StringIO())
+        full = self.client.get(self.url, {'mode': 'full'})
+        self.assertEqual((full.status_code, full['X-Cache']), (200, 'HIT'))
+        self.assertGreater(self.pages(full), self.pages(self.client.get(self.url)))
+
+    def test_batch_queues_missing_full_reports(self):
+        body = {'ids': [self.dataset_id], 'mode': 'full'}
+        response = self.client.post('/api/reports/batch/', body, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual([job['status'] for job in response.data['jobs']], [Job.PENDING])
+
+        call_command('report_worker', '--workers', '1', '--once', stdout=StringIO())
+        response = self.client.post('/api/reports/batch/', body, format='json')
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'application/zip'))
+
+
+@override_settings(REPORT_BATCH_WORKERS=1)
+class BatchReportTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        temporary_report_dir(self)
+        self.client = APIClient()
+        self.ids = [
+            self.client.post('/api/datasets/', {'file': csv_file(make_csv(30, seed=i))}, format='multipart').data['id']
+            for i in range(2)
+        ]
+
+    def test_zip_holds_each_report_once(self):
+        # The first report is cached, the second rendered for the batch
+        self.client.get(f'/api/datasets/{self.ids[0]}/pdf/')
+        response = self.client.post('/api/reports/batch/', {'ids': self.ids + self.ids[:1]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(sorted(archive.namelist()), sorted(f'equipment_report_{i}.pdf' for i in self.ids))
+        for name in archive.namelist():
+            self.assertTrue(archive.read(name).startswith(b'%PDF'))
+
+    def test_invalid_batches_are_rejected(self):
+        for body, expected in [
+            ({'ids': []}, 400),
+            ({'ids': ['1']}, 400),
+            ({'ids': self.ids, 'mode': 'poster'}, 400),
+            ({'ids': [self.ids[0], 999999]}, 404),
+        ]:
+            with self.subTest(body=body):
+                self.assertEqual(self.client.post('/api/reports/batch/', body, format='json').status_code, expected)
+        with override_settings(REPORT_BATCH_MAX_DATASETS=1):
+            self.assertEqual(self.client.post('/api/reports/batch/', {'ids': self.ids}, format='json').status_code, 400)
+
+
+class ExportTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.dataset_id = self.client.post(
+            '/api/datasets/', {'file': csv_file(make_csv(500))}, format='multipart').data['id']
+        self.url = f'/api/datasets/{self.dataset_id}/export/'
+        self.rows = [
+            {key: '' if value is None else str(value) for key, value in row.items()}
+            for row in Dataset.objects.get(pk=self.dataset_id).iter_rows()
+        ]
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv_and_ndjson(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(list(csv.DictReader(io.StringIO(self.body(response).decode()))), self.rows)
+
+        response = self.client.get(self.url, {'format': 'ndjson'})
+        lines = self.body(response).decode().splitlines()
+        self.assertEqual(len(lines), 500)
+        self.assertEqual(json.loads(lines[0])['Equipment Name'], self.rows[0]['Equipment Name'])
+
+    def test_gzip_encoding(self):
+        plain = self.body(self.client.get(self.url))
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br, gzip;q=0.8')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(self.body(response)), plain)
+
+    def test_npz_round_trip(self):
+        response = self.client.get(self.url, {'format': 'npz'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="equipment.npz"')
+        content = self.body(response)
+        self.assertTrue(all(info.compress_type == zipfile.ZIP_DEFLATED
+                            for info in zipfile.ZipFile(io.BytesIO(content)).infolist()))
+
+        columns = read_npz(io.BytesIO(content))
+        stored = Dataset.objects.get(pk=self.dataset_id).get_columns()
+        self.assertEqual(columns.names, list(stored.names))
+        self.assertEqual(list(columns.iter_rows()), list(stored.iter_rows()))
+
+    def test_unknown_format_is_a_json_error(self):
+        response = self.client.get(self.url, {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('format', json.loads(response.content))
+
+
+class ChartTests(DatasetTestCase):
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        x = np.arange(10_000, dtype=np.float64)
+        y = np.sin(x / 500)
+        y[4321] = 50
+        selected = charts.lttb(x, y, 200)
+        self.assertEqual(selected.size, 200)
+        self.assertEqual((selected[0], selected[-1]), (0, 9999))
+        self.assertTrue(np.all(np.diff(selected) > 0))
+        self.assertIn(4321, selected)
+        np.testing.assert_array_equal(charts.lttb(x[:50], y[:50], 200), np.arange(50))
+
+    def test_minmax_keeps_each_bucket_extreme(self):
+        y = np.random.default_rng(10).normal(size=10_000)
+        selected = charts.minmax(y, 100)
+        self.assertLessEqual(selected.size, 100)
+        for bucket in np.array_split(np.arange(y.size), 50):
+            self.assertIn(bucket[y[bucket].argmin()], selected)
+            self.assertIn(bucket[y[bucket].argmax()], selected)
+
+    def test_downsample_skips_missing_values(self):
+        values = np.arange(1000, dtype=np.float64)
+        values[::3] = np.nan
+        for method in charts.DOWNSAMPLERS:
+            with self.subTest(method=method):
+                series = charts.downsample(values, 50, method)
+                self.assertLessEqual(len(series['x']), 50)
+                self.assertEqual(series['y'], [float(i) for i in series['x']])
+                self.assertTrue(all(i % 3 for i in series['x']))
+
+    def test_chart_endpoint(self):
+        client = APIClient()
+        dataset_id = client.post('/api/datasets/', {'file': csv_file(make_csv(2000))}, format='multipart').data['id']
+        url = f'/api/datasets/{dataset_id}/chart/'
+        data = client.get(url, {'points': 100, 'downsample': 'minmax', 'grid': 8}).data
+        self.assertEqual(data['row_count'], 2000)
+        self.assertLessEqual(len(data['series']['flowrate']['x']), 100)
+        pressures = sum(1 for i in range(2000) if i % 17)
+        self.assertEqual(sum(map(sum, data['density']['counts'])), pressures)
+        for params in ({'points': 0}, {'downsample': 'random'}, {'density': 'Pressure'}):
+            with self.subTest(params=params):
+                self.assertEqual(client.get(url, params).status_code, 400)
+
+
+@override_settings(JOB_FALLBACK='inline')
+class BundleTests(DatasetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def upload(self, rows):
+        return self.client.post('/api/datasets/', {'file': csv_file(make_csv(rows))}, format='multipart').data['id']
+
+    def test_rows_continue_as_cursor_pages(self):
+        dataset_id = self.upload(250)
+        bundle = self.client.get(f'/api/datasets/{dataset_id}/bundle/', {'limit': 40}).data
+        self.assertEqual(bundle['dataset']['record_count'], 250)
+        self.assertEqual(bundle['summary']['total_count'], 250)
+        first = self.client.get(f'/api/datasets/{dataset_id}/rows/', {'pagination': 'cursor', 'limit': 40}).data
+        self.assertEqual(bundle['rows']['results'], first['results'])
+        self.assertEqual(bundle['rows']['next'], first['next'])
+
+        ids, next_link = [row['id'] for row in bundle['rows']['results']], bundle['rows']['next']
+        while next_link:
+            page = self.client.get(next_link).data
+            ids += [row['id'] for row in page['results']]
+            next_link = page['next']
+        expected = EquipmentRecord.objects.filter(dataset_id=dataset_id).order_by('id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+        last = self.client.get(f'/api/datasets/{dataset_id}/bundle/', {'limit': 250}).data['rows']
+        self.assertEqual((len(last['results']), last['next']), (250, None))
+        self.assertEqual(self.client.get(f'/api/datasets/{dataset_id}/bundle/', {'limit': 0}).status_code, 400)
+
+    @override_settings(JOB_FALLBACK='none')
+    def test_rows_are_null_until_written(self):
+        dataset_id = self.upload(60)
+        url = f'/api/datasets/{dataset_id}/bundle/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['rows'])
+        self.assertEqual(response.data['summary']['total_count'], 60)
+        self.assertNotIn('ETag', response)
+
+        for job_id in claim_jobs(5):
+            run_job(job_id)
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['rows']['results']), 60)
+        self.assertEqual(response['X-Cache'], 'MISS')
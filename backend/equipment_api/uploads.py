@@ -0,0 +1,64 @@
+"""
+Turning parsed uploads into datasets.
+
+One-shot uploads (``POST /datasets/``) are ingested in the request and
+stored with ``save_dataset``. Resumable upload sessions are ingested by a
+``Job.INGEST`` job instead (``ingest_upload``), so a large file never has
+to be parsed within a request timeout; the session records how it ended.
+"""
+from . import cache, jobs
+from .ingest import StoredFile, ingest_csv, strip_compression_suffix
+from .models import Dataset, UploadSession
+
+
+def save_dataset(result, filename, user):
+    """Store an ``ingest_csv`` result as a new dataset, keeping the 5 most recent"""
+    dataset = Dataset(
+        filename=strip_compression_suffix(filename),
+        content_hash=result.content_hash,
+        summary=result.summary,
+        summary_version=Dataset.SUMMARY_VERSION,
+        type_summary=result.type_summary,
+        quantile_sketches=result.sketches,
+        user=user if user is not None and user.is_authenticated else None
+    )
+    result.writer.store(dataset)
+    dataset.save()
+    # EquipmentRecord rows are written by a background job, which keeps
+    # large uploads well inside the request timeout
+    jobs.queue_records(dataset)
+
+    old_datasets = Dataset.objects.all().order_by('-uploaded_at')[5:]
+    for old_dataset in old_datasets:
+        # Cached responses and reports go with it, see signals.py
+        old_dataset.delete()
+    cache.invalidate(cache.LIST_SCOPE)
+    return dataset
+
+
+def ingest_upload(upload_id):
+    """Ingest a completely received upload session as a new dataset.
+
+    The session ends up ``complete`` with its dataset, or ``failed`` with
+    the error, which is raised again so the job fails too. Its bytes are
+    removed either way.
+    """
+    upload = UploadSession.objects.select_related('user').get(pk=upload_id)
+    if upload.status == UploadSession.COMPLETE:
+        # A requeued job whose first run got this far
+        return upload.dataset
+    try:
+        with StoredFile(open(upload.path, 'rb'), name=upload.filename) as file:
+            result = ingest_csv(file)
+        if not result.row_count:
+            raise ValueError('Empty CSV file')
+        dataset = save_dataset(result, upload.filename, upload.user)
+    except Exception as e:
+        upload.status, upload.error = UploadSession.FAILED, str(e)
+        upload.save(update_fields=['status', 'error', 'updated_at'])
+        upload.discard()
+        raise
+    upload.status, upload.dataset = UploadSession.COMPLETE, dataset
+    upload.save(update_fields=['status', 'dataset', 'updated_at'])
+    upload.discard()
+    return dataset
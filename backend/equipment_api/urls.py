@@ -4,6 +4,7 @@ from . import views
 
 router = DefaultRouter()
 router.register(r'datasets', views.DatasetViewSet, basename='dataset')
+router.register(r'uploads', views.UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -11,4 +12,6 @@ urlpatterns = [
     path('auth/logout/', views.logout_view, name='logout'),
     path('auth/register/', views.register_view, name='register'),
     path('auth/user/', views.current_user, name='current-user'),
+    path('reports/batch/', views.batch_reports, name='batch-reports'),
+    path('cache/stats/', views.cache_stats, name='cache-stats'),
 ]
@@ -1,28 +1,171 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import FileUploadParser, FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
-from django.http import HttpResponse
-from .models import Dataset
-from .serializers import DatasetSerializer, UserSerializer
-import csv
-import io
-from datetime import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.units import inch
+from django.utils import timezone
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.conf import settings
+import os
+import re
+import tempfile
+from datetime import timedelta
+from .models import Dataset, Job, UploadSession
+from .serializers import (
+    DatasetListSerializer, DatasetSerializer, EquipmentRecordSerializer, ReportJobSerializer,
+    UploadSessionSerializer, UserSerializer,
+)
+from .pagination import RowKeysetPagination, RowOffsetPagination, encode_cursor, get_ordering, order_queryset
+from .ingest import get_chunk_size, ingest_csv
+from .conditional import VALIDATOR_FIELDS, dataset_validators, not_modified, set_validators
+from .columnar import NUMERIC_COLUMNS
+from . import cache, charts, jobs, reports
+from .uploads import save_dataset
+from .export import EXPORTERS, CSVRenderer, NDJSONRenderer, NPZRenderer, accepts_gzip, gzip_chunks, write_npz
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 
 
+def parse_quantiles(request, default='0.5,0.95'):
+    """Parse ``?q=0.5,0.95``; returns ``(qs, None)`` or ``(None, error response)``"""
+    try:
+        qs = [float(q) for q in request.query_params.get('q', default).split(',')]
+    except ValueError:
+        qs = None
+    if not qs or any(not 0 <= q <= 1 for q in qs):
+        return None, Response({'error': 'q must be a comma-separated list of numbers between 0 and 1'},
+                              status=status.HTTP_400_BAD_REQUEST)
+    return qs, None
+
+
+def quantiles_response(sketches, qs):
+    result = {'quantiles': {}, 'counts': {}}
+    for name, sketch in sketches.items():
+        values = sketch.quantiles(qs)
+        result['quantiles'][name] = {
+            f'{q:g}': (None if value != value else float(value))
+            for q, value in zip(qs, values)
+        }
+        result['counts'][name] = sketch.n
+    return result
+
+
+def created_response(dataset, context):
+    """201 response for a new dataset; its rows are left out, the client pages them from ``/rows/``"""
+    serializer = DatasetSerializer(dataset, context=context, exclude=['data', 'records'])
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+def records_pending(job):
+    """503 for row requests while ``job`` is still writing the dataset's EquipmentRecord rows"""
+    if job.status == Job.FAILED:
+        return Response({'error': f'Writing rows failed: {job.error}'},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    response = Response({'error': 'Rows are still being written, retry shortly', 'job': job.status},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '2'
+    return response
+
+
+def first_row_page(request, dataset, limit):
+    """The first page of ``/rows/?pagination=cursor&limit=``, in that endpoint's shape"""
+    records = list(dataset.records.order_by('id')[:limit + 1])
+    next_link = None
+    if len(records) > limit:
+        records = records[:limit]
+        last = records[-1].id
+        rows_url = reverse('dataset-rows', args=[dataset.id])
+        url = request.build_absolute_uri(f'{rows_url}?pagination=cursor&limit={limit}')
+        next_link = replace_query_param(url, 'cursor', encode_cursor(last, last))
+    return {'next': next_link, 'results': EquipmentRecordSerializer(records, many=True).data}
+
+
+def cached_response(data, hit):
+    """Response for data from ``cache.cached_data``, marked with ``X-Cache``"""
+    response = Response(data)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
+
+
+def parse_report_mode(value):
+    """Validate a report ``mode``; returns ``(mode, None)`` or ``(None, error response)``"""
+    mode = value or 'summary'
+    if mode not in reports.MODES:
+        return None, Response({'error': f'mode must be one of {", ".join(reports.MODES)}'},
+                              status=status.HTTP_400_BAD_REQUEST)
+    return mode, None
+
+
+def parse_chart_options(request):
+    """Parse ``/chart/`` query options; returns ``(options, None)`` or ``(None, error response)``"""
+    params = request.query_params
+    columns = {name.lower(): name for name in NUMERIC_COLUMNS}
+
+    def bounded(name, default, maximum):
+        try:
+            value = int(params.get(name, default))
+        except ValueError:
+            value = 0
+        if not 1 <= value <= maximum:
+            raise ValueError(f'{name} must be an integer between 1 and {maximum}')
+        return value
+
+    try:
+        options = {
+            'points': bounded('points', charts.DEFAULT_POINTS, charts.MAX_POINTS),
+            'bins': bounded('bins', charts.HISTOGRAM_BINS, charts.MAX_BINS),
+            'grid_bins': bounded('grid', charts.DEFAULT_GRID_BINS, charts.MAX_BINS),
+            'method': params.get('downsample', 'lttb'),
+        }
+        if options['method'] not in charts.DOWNSAMPLERS:
+            raise ValueError(f'downsample must be one of {", ".join(charts.DOWNSAMPLERS)}')
+        pair = params.get('density', ','.join(charts.DEFAULT_DENSITY)).lower().split(',')
+        if len(pair) != 2 or not set(pair) <= set(columns):
+            raise ValueError(f'density must be two of {", ".join(NUMERIC_COLUMNS)}')
+        options['density_columns'] = tuple(columns[name] for name in pair)
+    except ValueError as e:
+        return None, Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return options, None
+
+
+RANGE_FILTER_FIELDS = ('flowrate', 'pressure', 'temperature')
+
+EXPORT_RENDERERS = [CSVRenderer, NDJSONRenderer, NPZRenderer]
+
+
+def filter_records(queryset, params):
+    """Apply ``?type=A,B`` and ``?<column>_min=`` / ``?<column>_max=`` filters"""
+    types = params.get('type')
+    if types:
+        queryset = queryset.filter(equipment_type__in=types.split(','))
+    for field in RANGE_FILTER_FIELDS:
+        for suffix, lookup in (('min', 'gte'), ('max', 'lte')):
+            value = params.get(f'{field}_{suffix}')
+            if value is None:
+                continue
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValidationError({f'{field}_{suffix}': 'Must be a number'})
+            queryset = queryset.filter(**{f'{field}__{lookup}': value})
+    return queryset
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class DatasetViewSet(viewsets.ModelViewSet):
     serializer_class = DatasetSerializer
     permission_classes = [AllowAny]
+    # Datasets are immutable once uploaded; validators and cached responses rely on it
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    # FileUploadParser takes uploads sent as the raw request body, named by Content-Disposition
+    parser_classes = [JSONParser, FormParser, MultiPartParser, FileUploadParser]
 
     def get_queryset(self):
         try:
@@ -34,11 +177,85 @@ class DatasetViewSet(viewsets.ModelViewSet):
             logger.error(f"Error getting queryset: {str(e)}", exc_info=True)
             return Dataset.objects.none()
     
+    def get_object_from(self, queryset):
+        """Like get_object(), but looked up in a customized ``queryset``"""
+        obj = get_object_or_404(self.filter_queryset(queryset), pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def get_object_only(self, *fields):
+        """Like get_object(), but only loads ``fields``; the rest are deferred"""
+        return self.get_object_from(self.get_queryset().only(*fields))
+
+    def check_not_modified(self, kind, version=0):
+        """Validators for the requested dataset, plus a 304 response if the client is up to date.
+
+        Only the fields needed for the validators are loaded, so a cache hit
+        costs one small query.
+        """
+        validators = dataset_validators(self.get_object_only(*VALIDATOR_FIELDS), self.request, kind, version)
+        return validators, not_modified(self.request, *validators)
+
+    def perform_content_negotiation(self, request, force=False):
+        """Reject unknown export formats with a 400 rather than DRF's 404"""
+        if self.action == 'export' and not force:
+            requested = request.query_params.get(self.settings.URL_FORMAT_OVERRIDE)
+            formats = [renderer.format for renderer in EXPORT_RENDERERS]
+            if requested is not None and requested not in formats:
+                raise ValidationError({'format': f'Must be one of {", ".join(formats)}'})
+        return super().perform_content_negotiation(request, force)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.action == 'export' and isinstance(response, Response) and response.status_code >= 400:
+            # Errors are JSON, not in the requested export format
+            request.accepted_renderer, request.accepted_media_type = JSONRenderer(), JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def cache_scope(self):
+        """Response cache scope of the requested dataset (after it was looked up)"""
+        return cache.dataset_scope(int(self.kwargs['pk']))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Dataset detail, cached per ``?fields=``/``?exclude=`` variant unless it includes the rows"""
+        validators, response = self.check_not_modified('detail', Dataset.SUMMARY_VERSION)
+        if response:
+            return response
+        fields = DatasetSerializer.requested_fields(request)
+        if 'records' in fields:
+            job = jobs.queue_records(self.get_object_only('id', 'records_written'))
+            if job:
+                return records_pending(job)
+        if fields & {'data', 'records'}:
+            return set_validators(Response(self.detail_data()), *validators)
+        data, hit = cache.cached_data(
+            self.cache_scope(), 'detail', request,
+            self.detail_data, Dataset.SUMMARY_VERSION,
+        )
+        return set_validators(cached_response(data, hit), *validators)
+
+    def detail_data(self):
+        """Serialized detail; fields that are not sent are not loaded"""
+        fields = DatasetSerializer.requested_fields(self.request)
+        queryset = self.get_queryset().defer(*Dataset.DERIVED_FIELDS)
+        if 'data' not in fields:
+            queryset = queryset.defer(*Dataset.ROW_STORAGE_FIELDS)
+        if 'summary' not in fields:
+            queryset = queryset.defer('summary')
+        if 'user' in fields:
+            queryset = queryset.select_related('user')
+        dataset = self.get_object_from(queryset)
+        return self.get_serializer(dataset).data
+
     def list(self, request, *args, **kwargs):
-        """Override list to return only last 5 datasets"""
-        queryset = self.get_queryset()[:5]
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        """Override list to return only last 5 datasets, without loading their rows"""
+        def list_data():
+            queryset = (self.get_queryset()
+                        .select_related('user')
+                        .only(*DatasetListSerializer.Meta.only_fields)[:5])
+            return DatasetListSerializer(queryset, many=True, context=self.get_serializer_context()).data
+
+        data, hit = cache.cached_data(cache.LIST_SCOPE, 'list', request, list_data)
+        return cached_response(data, hit)
 
     def create(self, request, *args, **kwargs):
         import logging
@@ -62,209 +279,425 @@ class DatasetViewSet(viewsets.ModelViewSet):
 
             logger.info(f"Processing file: {file.name}")
 
-            file_content = file.read().decode('utf-8')
-            csv_reader = csv.DictReader(io.StringIO(file_content))
-            data = list(csv_reader)
-            
-            if not data:
-                return Response({'error': 'Empty CSV file'}, status=status.HTTP_400_BAD_REQUEST)
+            result = ingest_csv(file, content_encoding=request.headers.get('Content-Encoding'))
 
-            logger.info(f"Parsed {len(data)} rows")
-
-            flowrates = [float(row.get('Flowrate', 0)) for row in data if row.get('Flowrate')]
-            pressures = [float(row.get('Pressure', 0)) for row in data if row.get('Pressure')]
-            temperatures = [float(row.get('Temperature', 0)) for row in data if row.get('Temperature')]
-
-            summary = {
-                'total_equipment': len(data),
-                'avg_flowrate': sum(flowrates) / len(flowrates) if flowrates else 0,
-                'avg_pressure': sum(pressures) / len(pressures) if pressures else 0,
-                'avg_temperature': sum(temperatures) / len(temperatures) if temperatures else 0,
-                'min_flowrate': min(flowrates) if flowrates else 0,
-                'max_flowrate': max(flowrates) if flowrates else 0,
-                'min_pressure': min(pressures) if pressures else 0,
-                'max_pressure': max(pressures) if pressures else 0,
-                'min_temperature': min(temperatures) if temperatures else 0,
-                'max_temperature': max(temperatures) if temperatures else 0,
-            }
+            if not result.row_count:
+                return Response({'error': 'Empty CSV file'}, status=status.HTTP_400_BAD_REQUEST)
 
-            type_counts = {}
-            for row in data:
-                eq_type = row.get('Type', 'Unknown')
-                type_counts[eq_type] = type_counts.get(eq_type, 0) + 1
-            summary['equipment_types'] = type_counts
+            logger.info(f"Parsed {result.row_count} rows")
 
             logger.info("Creating dataset...")
-            dataset = Dataset.objects.create(
-                filename=file.name,
-                data=data,
-                user=request.user if request.user.is_authenticated else None
-            )
+            dataset = save_dataset(result, file.name, request.user)
             logger.info(f"Dataset created: {dataset.id}")
 
-            old_datasets = Dataset.objects.all().order_by('-uploaded_at')[5:]
-            for old_dataset in old_datasets:
-                old_dataset.delete()
-
-            serializer = self.get_serializer(dataset)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return created_response(dataset, self.get_serializer_context())
 
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Error in create: {str(e)}", exc_info=True)
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-            
-            serializer = self.get_serializer(dataset)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-            
-        except Exception as e:
-            return Response(
-                {'error': f'Error processing CSV: {str(e)}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
     
     @action(detail=True, methods=['get'])
     def summary(self, request, pk=None):
         """Get summary statistics for a dataset"""
-        dataset = self.get_object()
-        summary = dataset.get_summary()
-        return Response(summary)
+        validators, response = self.check_not_modified('summary', Dataset.SUMMARY_VERSION)
+        if response:
+            return response
+        summary, hit = cache.cached_data(
+            self.cache_scope(), 'summary', request,
+            lambda: self.get_object_only('id', 'summary', 'summary_version').get_summary(),
+            Dataset.SUMMARY_VERSION,
+        )
+        return set_validators(cached_response(summary, hit), *validators)
     
+    @action(detail=True, methods=['get'])
+    def rows(self, request, pk=None):
+        """Page through a dataset's rows from EquipmentRecord.
+
+        Supports ``?ordering=[-]<field>``, ``?type=A,B``, ``?<column>_min=``
+        and ``?<column>_max=``. Pages with ``?limit=&offset=`` by default, or
+        by keyset with ``?pagination=cursor`` and the returned ``next`` links.
+        Answers 503 with ``Retry-After`` until the rows have been written.
+        """
+        dataset = self.get_object_only('id', 'records_written')
+        job = jobs.queue_records(dataset)
+        if job:
+            return records_pending(job)
+
+        queryset = filter_records(dataset.records.all(), request.query_params)
+        if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+            paginator = RowKeysetPagination()
+        else:
+            paginator = RowOffsetPagination()
+            queryset = order_queryset(queryset, *get_ordering(request))
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = EquipmentRecordSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request, pk=None):
+        """Stream the dataset's rows as CSV (default) or NDJSON (``?format=ndjson``).
+
+        The body is gzip-encoded when the client sends ``Accept-Encoding: gzip``.
+        ``?format=npz`` sends typed columns as a NumPy archive instead.
+        """
+        renderer = request.accepted_renderer
+        dataset = self.get_object_only('id', 'filename', *Dataset.ROW_STORAGE_FIELDS)
+        stem = dataset.filename.rsplit('.', 1)[0] or f'dataset_{dataset.id}'
+        if renderer.format == 'npz':
+            output = tempfile.TemporaryFile()
+            write_npz(dataset, output)
+            output.seek(0)
+            return FileResponse(output, as_attachment=True, filename=f'{stem}.npz',
+                                content_type=renderer.media_type)
+
+        chunks = EXPORTERS[renderer.format](dataset)
+        if accepts_gzip(request):
+            chunks = gzip_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=f'{renderer.media_type}; charset=utf-8')
+        if accepts_gzip(request):
+            response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+        response['Content-Disposition'] = f'attachment; filename="{stem}.{renderer.format}"'
+        return response
+
+    @action(detail=True, methods=['get'])
+    def chart(self, request, pk=None):
+        """Chart-ready histograms, a 2-D density grid and downsampled series (see charts.py).
+
+        Options: ``?points=`` per series, ``?downsample=lttb|minmax``,
+        ``?bins=`` per histogram, ``?grid=`` bins per density axis and
+        ``?density=Pressure,Temperature``.
+        """
+        options, error = parse_chart_options(request)
+        if error:
+            return error
+        version = f'{Dataset.SUMMARY_VERSION}.{charts.CHART_VERSION}'
+        validators, response = self.check_not_modified('chart', version)
+        if response:
+            return response
+
+        def chart_data():
+            dataset = self.get_object_only('id', 'summary', 'summary_version', *Dataset.ROW_STORAGE_FIELDS)
+            return charts.chart_data(dataset, **options)
+
+        data, hit = cache.cached_data(self.cache_scope(), 'chart', request, chart_data, version)
+        return set_validators(cached_response(data, hit), *validators)
+
+    @action(detail=True, methods=['get'])
+    def bundle(self, request, pk=None):
+        """Everything a dashboard shows for a dataset, in one response.
+
+        Metadata, the stored summary, per-type statistics, ``/chart/`` data
+        (same options) and the first ``?limit=`` rows as
+        ``/rows/?pagination=cursor`` pages them, ``next`` link included.
+        While the rows are still being written ``rows`` is null; such
+        bundles are neither cached nor validated.
+        """
+        options, error = parse_chart_options(request)
+        if error:
+            return error
+        try:
+            limit = int(request.query_params.get('limit', RowOffsetPagination.default_limit))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= RowOffsetPagination.max_limit:
+            return Response({'error': f'limit must be an integer between 1 and {RowOffsetPagination.max_limit}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        pending = jobs.queue_records(self.get_object_only('id', 'records_written')) is not None
+
+        def bundle_data():
+            dataset = self.get_object_from(
+                self.get_queryset().select_related('user').defer('quantile_sketches'))
+            return {
+                'dataset': DatasetListSerializer(dataset).data,
+                'summary': dataset.get_summary(),
+                'by_type': dataset.get_type_summary(),
+                'chart': charts.chart_data(dataset, **options),
+                'rows': None if pending else first_row_page(request, dataset, limit),
+            }
+
+        if pending:
+            return Response(bundle_data())
+        version = f'{Dataset.SUMMARY_VERSION}.{charts.CHART_VERSION}'
+        validators, response = self.check_not_modified('bundle', version)
+        if response:
+            return response
+        data, hit = cache.cached_data(self.cache_scope(), 'bundle', request, bundle_data, version)
+        return set_validators(cached_response(data, hit), *validators)
+
+    @action(detail=True, methods=['get'], url_path='by-type')
+    def by_type(self, request, pk=None):
+        """Count and statistics of each numeric column per equipment type"""
+        dataset = self.get_object_only('id', 'type_summary')
+        return Response(dataset.get_type_summary())
+
+    @action(detail=True, methods=['get'])
+    def quantiles(self, request, pk=None):
+        """Approximate percentiles from the dataset's stored quantile sketches"""
+        qs, error = parse_quantiles(request)
+        if error:
+            return error
+        dataset = self.get_object_only('id', 'quantile_sketches')
+        return Response(quantiles_response(dataset.get_sketches(), qs))
+
+    @action(detail=False, methods=['get'], url_path='quantiles', url_name='fleet-quantiles')
+    def fleet_quantiles(self, request):
+        """Percentiles across several datasets (``?ids=1,2,3``, default all) by merging their sketches"""
+        qs, error = parse_quantiles(request)
+        if error:
+            return error
+        datasets = self.get_queryset().only('id', 'quantile_sketches')
+        ids = request.query_params.get('ids')
+        if ids:
+            try:
+                datasets = datasets.filter(id__in=[int(i) for i in ids.split(',')])
+            except ValueError:
+                return Response({'error': 'ids must be a comma-separated list of integers'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        merged = {}
+        dataset_ids = []
+        for dataset in datasets:
+            dataset_ids.append(dataset.id)
+            for name, sketch in dataset.get_sketches().items():
+                if name in merged:
+                    merged[name].merge(sketch)
+                else:
+                    merged[name] = sketch
+        response = quantiles_response(merged, qs)
+        response['datasets'] = dataset_ids
+        return Response(response)
+
     @action(detail=True, methods=['get'])
     def pdf(self, request, pk=None):
-        """Generate and download PDF report"""
-        dataset = self.get_object()
-        summary = dataset.get_summary()
-        
-        # Create PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1a237e'),
-            spaceAfter=30,
-        )
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#283593'),
-            spaceAfter=12,
+        """Download the PDF report, rendered once per dataset content and template version.
+
+        ``?mode=full`` lists every row instead of the first 20. Full reports
+        are only served once rendered; until then this queues the report
+        like ``pdf/jobs`` and answers ``202`` with the job, whose status URL
+        is in ``Location``.
+        """
+        mode, error = parse_report_mode(request.query_params.get('mode'))
+        if error:
+            return error
+        validators, response = self.check_not_modified(
+            'pdf', f'{Dataset.SUMMARY_VERSION}.{reports.TEMPLATE_VERSION}')
+        if response:
+            return response
+        dataset = self.get_object_only(*reports.REPORT_FIELDS)
+        if mode == 'full':
+            report, hit = reports.open_cached_report(dataset, mode), True
+            if report is None:
+                return self.queued_report(dataset, mode)
+        else:
+            report, hit = reports.open_report(dataset, mode)
+        response = FileResponse(
+            report, as_attachment=True, filename=reports.report_filename(dataset.id, mode),
+            content_type='application/pdf',
         )
-        
-        # Title
-        elements.append(Paragraph("Chemical Equipment Analysis Report", title_style))
-        elements.append(Spacer(1, 0.2*inch))
-        
-        # Dataset info
-        elements.append(Paragraph(f"<b>Dataset:</b> {dataset.filename}", styles['Normal']))
-        elements.append(Paragraph(f"<b>Upload Date:</b> {dataset.uploaded_at.strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-        elements.append(Paragraph(f"<b>Total Records:</b> {summary['total_count']}", styles['Normal']))
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Equipment Type Distribution
-        elements.append(Paragraph("Equipment Type Distribution", heading_style))
-        type_data = [['Equipment Type', 'Count']]
-        for eq_type, count in summary['equipment_types'].items():
-            type_data.append([eq_type, str(count)])
-        
-        type_table = Table(type_data, colWidths=[3*inch, 2*inch])
-        type_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3f51b5')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(type_table)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Statistics
-        elements.append(Paragraph("Parameter Statistics", heading_style))
-        stats_data = [['Parameter', 'Average', 'Min', 'Max', 'Std Dev']]
-        
-        for param in ['flowrate', 'pressure', 'temperature']:
-            stats = summary['statistics'][param]
-            stats_data.append([
-                param.capitalize(),
-                f"{stats['average']:.2f}",
-                f"{stats['min']:.2f}",
-                f"{stats['max']:.2f}",
-                f"{stats['std']:.2f}"
-            ])
-        
-        stats_table = Table(stats_data, colWidths=[1.5*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch])
-        stats_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3f51b5')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(stats_table)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Equipment Data
-        elements.append(PageBreak())
-        elements.append(Paragraph("Equipment Data", heading_style))
-        
-        data_rows = [['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temp']]
-        for record in dataset.data[:20]:  # Limit to first 20 records
-            data_rows.append([
-                record['Equipment Name'],
-                record['Type'],
-                str(record['Flowrate']),
-                str(record['Pressure']),
-                str(record['Temperature'])
-            ])
-        
-        if len(dataset.data) > 20:
-            data_rows.append(['...', '...', '...', '...', '...'])
-        
-        data_table = Table(data_rows, colWidths=[1.8*inch, 1.3*inch, 1.1*inch, 1.1*inch, 1*inch])
-        data_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3f51b5')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(data_table)
-        
-        # Footer
-        elements.append(Spacer(1, 0.5*inch))
-        elements.append(Paragraph(
-            f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            styles['Normal']
-        ))
-        
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        # Return PDF response
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="equipment_report_{dataset.id}.pdf"'
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return set_validators(response, *validators)
+
+    def queued_report(self, dataset, mode):
+        """``202`` with the job rendering ``dataset``'s report, queued if need be"""
+        job = jobs.enqueue(Job.REPORT, dataset, mode=mode)
+        response = Response(ReportJobSerializer(job, context=self.get_serializer_context()).data,
+                            status=status.HTTP_202_ACCEPTED)
+        response['Location'] = self.request.build_absolute_uri(
+            reverse('dataset-pdf-job', args=[dataset.id, job.id]))
+        return response
+
+    @action(detail=True, methods=['post'], url_path='pdf/jobs')
+    def pdf_jobs(self, request, pk=None):
+        """Queue the PDF report (``mode`` in the body or query) for rendering in the background.
+
+        Returns the job already queued for the same report, if any.
+        """
+        mode, error = parse_report_mode(request.data.get('mode') or request.query_params.get('mode'))
+        if error:
+            return error
+        dataset = self.get_object_only('id', 'content_hash')
+        if reports.report_path(dataset, mode).exists():
+            # Already rendered, nothing for a worker to do
+            job = Job.objects.create(kind=Job.REPORT, dataset=dataset, mode=mode,
+                                     status=Job.DONE, finished_at=timezone.now())
+            serializer = ReportJobSerializer(job, context=self.get_serializer_context())
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        return self.queued_report(dataset, mode)
+
+    @action(detail=True, methods=['get'], url_path=r'pdf/jobs/(?P<job_id>[0-9]+)')
+    def pdf_job(self, request, pk=None, job_id=None):
+        """Status of a queued PDF report.
+
+        A job left running by a worker that stopped sending heartbeats is
+        requeued, and restarted on this process's background thread if no
+        worker is alive (see jobs.py).
+        """
+        dataset = self.get_object_only('id')
+        job = jobs.poll(get_object_or_404(dataset.jobs.filter(kind=Job.REPORT), pk=job_id))
+        return Response(ReportJobSerializer(job, context=self.get_serializer_context()).data)
+
+
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """Resumable CSV uploads.
+
+    ``POST /uploads/`` with ``filename`` and ``size`` opens a session; the
+    file is then sent in any number of ``PUT /uploads/{id}/`` requests,
+    each a raw byte range with a ``Content-Range: bytes start-end/size``
+    header starting at the session's ``offset``. After an interruption,
+    ``GET /uploads/{id}/`` gives the offset to resume from.
+    ``POST /uploads/{id}/finalize/`` queues the file for ingestion and
+    answers ``202``; the session is then polled with ``GET`` until it is
+    ``complete``, with its ``dataset``, or ``failed``, with an ``error``.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [AllowAny]
+
+    def perform_create(self, serializer):
+        expired = UploadSession.objects.filter(
+            updated_at__lt=timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_EXPIRY),
+        ).exclude(status=UploadSession.INGESTING)
+        for session in expired:
+            session.discard()
+            session.delete()
+
+        upload = serializer.save(user=self.request.user if self.request.user.is_authenticated else None)
+        os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+        open(upload.path, 'wb').close()
+
+    def retrieve(self, request, *args, **kwargs):
+        """Session status; restarts its ingestion if whoever ran it is gone (see jobs.py)"""
+        upload = self.get_object()
+        if upload.status == UploadSession.INGESTING:
+            job = upload.jobs.filter(kind=Job.INGEST).order_by('-id').first()
+            if job is not None:
+                jobs.poll(job)
+                upload.refresh_from_db()
+        return Response(self.get_serializer(upload).data)
+
+    def perform_destroy(self, instance):
+        instance.discard()
+        instance.delete()
+
+    def update(self, request, pk=None):
+        """Write one byte range of the file, streamed from the request body"""
+        upload = self.get_object()
+        if upload.status != UploadSession.OPEN:
+            return Response({'error': 'Upload is already finalized'}, status=status.HTTP_409_CONFLICT)
+        match = CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return Response({'error': 'Content-Range: bytes start-end/size header required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        start, end, total = (int(value) for value in match.groups())
+        if total != upload.size or end < start or end >= upload.size:
+            return Response({'error': f'Range must lie within the upload size of {upload.size} bytes'},
+                            status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        if start != upload.offset:
+            return Response({'error': f'Range must start at offset {upload.offset}', 'offset': upload.offset},
+                            status=status.HTTP_409_CONFLICT)
+
+        expected = end - start + 1
+        received = 0
+        stream = request.stream
+        with open(upload.path, 'r+b') as f:
+            f.seek(start)
+            while stream is not None and received < expected:
+                try:
+                    chunk = stream.read(min(get_chunk_size(), expected - received))
+                except OSError:
+                    break
+                if not chunk:
+                    break
+                f.write(chunk)
+                received += len(chunk)
+
+        # Only advance from the offset this request started at, in case of a concurrent PUT
+        UploadSession.objects.filter(pk=upload.pk, offset=start).update(
+            offset=start + received, updated_at=timezone.now())
+        upload.refresh_from_db()
+        if received < expected:
+            return Response({'error': f'Received {received} of {expected} bytes; resume from offset',
+                             'offset': upload.offset}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(upload).data)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """Queue the completely received file for ingestion as a new dataset"""
+        upload = self.get_object()
+        if upload.status != UploadSession.OPEN:
+            return Response({'error': 'Upload is already finalized', 'dataset': upload.dataset_id},
+                            status=status.HTTP_409_CONFLICT)
+        if upload.offset != upload.size:
+            return Response({'error': f'Received {upload.offset} of {upload.size} bytes', 'offset': upload.offset},
+                            status=status.HTTP_409_CONFLICT)
+        # Only the first of concurrent finalize requests queues the job
+        if not UploadSession.objects.filter(pk=upload.pk, status=UploadSession.OPEN).update(
+                status=UploadSession.INGESTING, updated_at=timezone.now()):
+            return Response({'error': 'Upload is already finalized'}, status=status.HTTP_409_CONFLICT)
+        jobs.enqueue(Job.INGEST, None, upload=upload)
+        upload.refresh_from_db()
+        response = Response(self.get_serializer(upload).data, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = request.build_absolute_uri(reverse('upload-detail', args=[upload.id]))
         return response
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def batch_reports(request):
+    """Stream a ZIP of the PDF reports of ``ids``, rendered in parallel.
+
+    Body: ``{"ids": [1, 2, 3], "mode": "summary"}``. Entries are added to
+    the archive as their reports complete. Full reports are only rendered
+    by jobs: any not rendered yet are queued, and the answer is ``202``
+    with their jobs until they are done.
+    """
+    mode, error = parse_report_mode(request.data.get('mode'))
+    if error:
+        return error
+    ids = request.data.get('ids')
+    if (not isinstance(ids, list) or not ids
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        return Response({'error': 'ids must be a non-empty list of dataset ids'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.REPORT_BATCH_MAX_DATASETS:
+        return Response({'error': f'At most {settings.REPORT_BATCH_MAX_DATASETS} datasets per batch'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    datasets = Dataset.objects.only(*reports.REPORT_FIELDS).in_bulk(ids)
+    missing = [i for i in ids if i not in datasets]
+    if missing:
+        return Response({'error': 'Datasets not found', 'ids': missing}, status=status.HTTP_404_NOT_FOUND)
+    if mode == 'full':
+        queued = [
+            jobs.enqueue(Job.REPORT, datasets[i], mode=mode)
+            for i in ids if not reports.report_path(datasets[i], mode).exists()
+        ]
+        if queued:
+            serializer = ReportJobSerializer(queued, many=True, context={'request': request})
+            return Response({'jobs': serializer.data}, status=status.HTTP_202_ACCEPTED)
+
+    response = StreamingHttpResponse(
+        reports.iter_report_zip([datasets[i] for i in ids], mode, settings.REPORT_BATCH_WORKERS),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = 'attachment; filename="equipment_reports.zip"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def cache_stats(request):
+    """Hit/miss counters of the dataset response cache"""
+    return Response(cache.stats())
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login_view(request):
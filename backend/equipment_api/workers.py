@@ -0,0 +1,23 @@
+"""
+Process pools for CPU-heavy work that should run on all cores.
+
+Workers are started with the ``spawn`` method so they never share the
+parent's database connections, and each one runs ``django.setup()`` once
+so it can use the ORM.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def process_pool(max_workers):
+    """Create a ``ProcessPoolExecutor`` whose workers have Django set up"""
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
@@ -162,6 +162,7 @@ CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
     'authorization',
+    'content-range',  # Resumable upload chunks (PUT /api/uploads/{id}/)
     'content-type',
     'dnt',
     'origin',
@@ -174,6 +175,64 @@ CORS_ALLOW_HEADERS = [
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 
+# CSV ingestion reads uploads in chunks of this many bytes
+CSV_UPLOAD_CHUNK_SIZE = int(os.environ.get('CSV_UPLOAD_CHUNK_SIZE', 65536))  # 64KB
+
+# Uploads of at least this many bytes are parsed in parallel by CSV_PARSE_WORKERS processes
+CSV_PARALLEL_THRESHOLD = int(os.environ.get('CSV_PARALLEL_THRESHOLD', 64 * 1024 * 1024))  # 64MB
+CSV_PARSE_WORKERS = int(os.environ.get('CSV_PARSE_WORKERS', os.cpu_count() or 1))
+
+# Rows per bulk_create batch when writing EquipmentRecord rows
+EQUIPMENT_RECORD_BATCH_SIZE = int(os.environ.get('EQUIPMENT_RECORD_BATCH_SIZE', 2000))
+
+# Cache for serialized dataset responses (equipment_api/cache.py). Local
+# memory by default; set CACHE_DIR to share a file-based cache between
+# worker processes. Neither needs an external service.
+# Entries kept before a third of them are culled; with RESPONSE_CACHE_MAX_BYTES
+# this bounds the cache at about 200 x 2MB = 400MB
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 200))
+if os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+            'OPTIONS': {'MAX_ENTRIES': RESPONSE_CACHE_MAX_ENTRIES},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'equipment-responses',
+            'OPTIONS': {'MAX_ENTRIES': RESPONSE_CACHE_MAX_ENTRIES},
+        }
+    }
+
+# Seconds a cached dataset response is kept
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 3600))
+# Larger responses (pickled size) are served without being cached
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 2 * 1024 * 1024))  # 2MB
+
+# Rendered PDF reports are kept here, least recently used evicted past the size limit
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', str(MEDIA_ROOT / 'reports'))
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # 256MB
+
+# How queued jobs (see equipment_api/jobs.py) run when no report_worker takes
+# them: 'thread' (a background thread of the web process), 'inline' or 'none'
+JOB_FALLBACK = os.environ.get('JOB_FALLBACK', 'thread')
+# Seconds without a heartbeat after which a job runner counts as gone: its
+# running jobs are requeued, and the web process stops relying on it
+WORKER_HEARTBEAT_TIMEOUT = int(os.environ.get('WORKER_HEARTBEAT_TIMEOUT', 30))
+
+# Batch report export (POST /api/reports/batch/): worker processes and datasets per request
+REPORT_BATCH_WORKERS = int(os.environ.get('REPORT_BATCH_WORKERS', os.cpu_count() or 1))
+REPORT_BATCH_MAX_DATASETS = int(os.environ.get('REPORT_BATCH_MAX_DATASETS', 50))
+
+# Resumable uploads (/api/uploads/): received bytes are kept here until finalized;
+# sessions not updated for UPLOAD_SESSION_EXPIRY seconds are removed
+UPLOAD_SESSION_DIR = os.environ.get('UPLOAD_SESSION_DIR', str(MEDIA_ROOT / 'uploads'))
+UPLOAD_SESSION_EXPIRY = int(os.environ.get('UPLOAD_SESSION_EXPIRY', 24 * 3600))
+
 # Create uploads directory
 UPLOADS_DIR = BASE_DIR / 'uploads'
 UPLOADS_DIR.mkdir(exist_ok=True)
@@ -1,4 +1,11 @@
+import gzip
+import io
+import os
+import shutil
 import sys
+import tempfile
+import time
+import numpy as np
 import requests
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
@@ -15,6 +22,63 @@ import pandas as pd
 
 
 API_BASE_URL = 'http://localhost:8000/api'
+NUMERIC_COLUMNS = ['Flowrate', 'Pressure', 'Temperature']
+# Resumable uploads are sent in chunks of this size; a failed chunk is
+# retried from the server's offset up to UPLOAD_RETRIES times in a row
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_RETRIES = 5
+# A finalized upload is ingested in the background; poll it once a second
+# for up to this many seconds
+UPLOAD_MAX_POLLS = 600
+
+
+def read_npz_frame(content):
+    """Build a DataFrame from the typed columns of ``export/?format=npz``"""
+    with np.load(io.BytesIO(content)) as npz:
+        offsets = npz['name_offsets'].tolist()
+        payload = npz['name_data'].tobytes()
+        return pd.DataFrame({
+            'Equipment Name': [payload[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)],
+            'Type': pd.Categorical.from_codes(npz['type_codes'], npz['type_labels']),
+            'Flowrate': npz['flowrate'],
+            'Pressure': npz['pressure'],
+            'Temperature': npz['temperature'],
+        })
+
+
+# Record fields as ``/rows/`` sends them -> DataFrame columns
+RECORD_COLUMNS = {
+    'equipment_name': 'Equipment Name',
+    'equipment_type': 'Type',
+    'flowrate': 'Flowrate',
+    'pressure': 'Pressure',
+    'temperature': 'Temperature',
+}
+
+
+def rows_frame(records):
+    """Build a DataFrame like ``read_npz_frame``'s from records as ``/rows/`` sends them"""
+    frame = pd.DataFrame(records, columns=list(RECORD_COLUMNS)).rename(columns=RECORD_COLUMNS)
+    for name in NUMERIC_COLUMNS:
+        frame[name] = pd.to_numeric(frame[name], errors='coerce')
+    return frame
+
+
+def compressed_copy(path):
+    """gzip ``path`` into a temporary file and return its path; the caller removes it"""
+    with open(path, 'rb') as source, tempfile.NamedTemporaryFile(suffix='.csv.gz', delete=False) as target:
+        with gzip.GzipFile(fileobj=target, mode='wb', compresslevel=6) as compressor:
+            shutil.copyfileobj(source, compressor, UPLOAD_CHUNK_SIZE)
+    return target.name
+
+
+def format_value(value):
+    """Show a float the way it appeared in the CSV; missing values are blank"""
+    if value != value:
+        return ''
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
 
 
 class LoginWindow(QWidget):
@@ -142,6 +206,12 @@ class MainWindow(QMainWindow):
         self.datasets = []
         self.selected_dataset = None
         self.summary = None
+        self.chart = None
+        # First page of rows from the bundle; all rows are fetched when the data tab is opened
+        self.rows = None
+        self.rows_complete = False
+        # url -> (ETag, parsed JSON) for responses that can be revalidated
+        self.response_cache = {}
         self.init_ui()
         self.load_datasets()
     
@@ -204,6 +274,10 @@ class MainWindow(QMainWindow):
         self.pdf_btn.clicked.connect(self.download_pdf)
         dataset_layout.addWidget(self.pdf_btn)
         
+        self.batch_pdf_btn = QPushButton('Download All Reports')
+        self.batch_pdf_btn.clicked.connect(self.download_all_pdfs)
+        dataset_layout.addWidget(self.batch_pdf_btn)
+        
         dataset_layout.addStretch()
         main_layout.addLayout(dataset_layout)
         
@@ -225,6 +299,7 @@ class MainWindow(QMainWindow):
         self.setup_charts_tab()
         self.tabs.addTab(self.charts_tab, 'Charts')
         
+        self.tabs.currentChanged.connect(self.on_tab_changed)
         main_layout.addWidget(self.tabs)
         
         # Status bar
@@ -267,11 +342,15 @@ class MainWindow(QMainWindow):
         self.params_canvas = MatplotlibCanvas(self, width=5, height=3)
         layout.addWidget(self.params_canvas)
         
+        # Parameter trends chart (downsampled on the server)
+        self.trend_canvas = MatplotlibCanvas(self, width=5, height=3)
+        layout.addWidget(self.trend_canvas)
+        
         self.charts_tab.setLayout(layout)
     
     def browse_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
-            self, 'Select CSV File', '', 'CSV Files (*.csv)'
+            self, 'Select CSV File', '', 'CSV Files (*.csv *.csv.gz)'
         )
         if file_path:
             self.selected_file = file_path
@@ -283,11 +362,18 @@ class MainWindow(QMainWindow):
             return
         
         try:
-            with open(self.selected_file, 'rb') as f:
-                files = {'file': f}
-                response = self.session.post(f'{API_BASE_URL}/datasets/', files=files)
+            if self.selected_file.lower().endswith('.gz'):
+                response = self.upload_chunked(self.selected_file)
+            else:
+                # CSVs shrink 8-10x; the server decompresses them while parsing
+                self.statusBar().showMessage('Compressing...')
+                compressed = compressed_copy(self.selected_file)
+                try:
+                    response = self.upload_chunked(compressed, os.path.basename(self.selected_file) + '.gz')
+                finally:
+                    os.remove(compressed)
             
-            if response.status_code == 201:
+            if response.status_code == 200 and response.json()['status'] == 'complete':
                 QMessageBox.information(self, 'Success', 'File uploaded successfully!')
                 self.selected_file = None
                 self.file_label.setText('No file selected')
@@ -299,6 +385,58 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, 'Error', str(e))
     
+    def upload_chunked(self, path, filename=None):
+        """Send a file through a resumable upload session and return its final status response"""
+        size = os.path.getsize(path)
+        response = self.session.post(
+            f'{API_BASE_URL}/uploads/', json={'filename': filename or os.path.basename(path), 'size': size}
+        )
+        if response.status_code != 201:
+            return response
+        url = f'{API_BASE_URL}/uploads/{response.json()["id"]}/'
+        
+        offset = 0
+        failures = 0
+        with open(path, 'rb') as f:
+            while offset < size:
+                f.seek(offset)
+                chunk = f.read(UPLOAD_CHUNK_SIZE)
+                try:
+                    response = self.session.put(url, data=chunk, timeout=120, headers={
+                        'Content-Type': 'application/octet-stream',
+                        'Content-Range': f'bytes {offset}-{offset + len(chunk) - 1}/{size}',
+                    })
+                    if response.status_code == 200:
+                        offset = response.json()['offset']
+                        failures = 0
+                        self.statusBar().showMessage(f'Uploading... {offset * 100 // size}%')
+                        QApplication.processEvents()
+                        continue
+                except requests.RequestException:
+                    pass
+                failures += 1
+                if failures > UPLOAD_RETRIES:
+                    raise RuntimeError(f'Upload interrupted at {offset} of {size} bytes')
+                time.sleep(failures)
+                # Resume from whatever the server has received
+                try:
+                    offset = self.session.get(url, timeout=30).json()['offset']
+                except requests.RequestException:
+                    pass
+        
+        self.statusBar().showMessage('Processing upload...')
+        response = self.session.post(f'{url}finalize/')
+        if response.status_code != 202:
+            return response
+        # Ingestion runs in a background job; poll the session until it ends
+        for _ in range(UPLOAD_MAX_POLLS):
+            if response.json()['status'] != 'ingesting':
+                return response
+            QApplication.processEvents()
+            time.sleep(1)
+            response = self.session.get(url, timeout=30)
+        raise RuntimeError('The upload is still being processed; it will appear in the dataset list once done')
+    
     def load_datasets(self):
         try:
             response = self.session.get(f'{API_BASE_URL}/datasets/')
@@ -321,21 +459,56 @@ class MainWindow(QMainWindow):
             if dataset_id:
                 self.load_dataset(dataset_id)
     
+    def get_json(self, url):
+        """GET ``url`` as JSON, reusing the cached copy when the server answers 304"""
+        cached = self.response_cache.get(url)
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        response = self.session.get(url, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        if 'ETag' in response.headers:
+            self.response_cache[url] = (response.headers['ETag'], data)
+        return data
+
     def load_dataset(self, dataset_id):
         try:
-            # Load dataset details
-            response = self.session.get(f'{API_BASE_URL}/datasets/{dataset_id}/')
-            if response.status_code == 200:
-                self.selected_dataset = response.json()
-            
-            # Load summary
-            response = self.session.get(f'{API_BASE_URL}/datasets/{dataset_id}/summary/')
-            if response.status_code == 200:
-                self.summary = response.json()
+            # Metadata, summary, chart series and the first rows in one request
+            bundle = self.get_json(f'{API_BASE_URL}/datasets/{dataset_id}/bundle/')
+            if bundle is not None:
+                self.selected_dataset = bundle['dataset']
+                self.summary = bundle['summary']
+                self.chart = bundle['chart']
+                # The bundle has no rows while they are still being written; the
+                # data tab then loads them all from the export
+                rows = bundle['rows']
+                self.rows = rows_frame(rows['results']) if rows is not None else None
+                self.rows_complete = rows is not None and rows['next'] is None
+                if self.tabs.currentWidget() is self.data_tab:
+                    self.load_all_rows()
                 self.update_views()
         except Exception as e:
             self.statusBar().showMessage(f'Error loading dataset: {str(e)}')
     
+    def on_tab_changed(self, index):
+        if self.tabs.widget(index) is self.data_tab and self.selected_dataset and not self.rows_complete:
+            try:
+                self.load_all_rows()
+                self.update_data_table()
+            except Exception as e:
+                self.statusBar().showMessage(f'Error loading rows: {str(e)}')
+    
+    def load_all_rows(self):
+        """Replace the first page of rows with all rows, sent as typed columns"""
+        response = self.session.get(
+            f'{API_BASE_URL}/datasets/{self.selected_dataset["id"]}/export/', params={'format': 'npz'}
+        )
+        if response.status_code == 200:
+            self.rows = read_npz_frame(response.content)
+            self.rows_complete = True
+    
     def update_views(self):
         if not self.selected_dataset or not self.summary:
             return
@@ -386,15 +559,16 @@ PARAMETER STATISTICS
         self.summary_text.setText(text)
     
     def update_data_table(self):
-        data = self.selected_dataset['data']
-        self.data_table.setRowCount(len(data))
+        rows = self.rows if self.rows is not None else pd.DataFrame()
+        self.data_table.setRowCount(len(rows))
         
-        for row_idx, row in enumerate(data):
-            self.data_table.setItem(row_idx, 0, QTableWidgetItem(row['Equipment Name']))
-            self.data_table.setItem(row_idx, 1, QTableWidgetItem(row['Type']))
-            self.data_table.setItem(row_idx, 2, QTableWidgetItem(str(row['Flowrate'])))
-            self.data_table.setItem(row_idx, 3, QTableWidgetItem(str(row['Pressure'])))
-            self.data_table.setItem(row_idx, 4, QTableWidgetItem(str(row['Temperature'])))
+        for row_idx, row in enumerate(rows.itertuples(index=False)):
+            name, eq_type, flowrate, pressure, temperature = row
+            self.data_table.setItem(row_idx, 0, QTableWidgetItem(name))
+            self.data_table.setItem(row_idx, 1, QTableWidgetItem(eq_type))
+            self.data_table.setItem(row_idx, 2, QTableWidgetItem(format_value(flowrate)))
+            self.data_table.setItem(row_idx, 3, QTableWidgetItem(format_value(pressure)))
+            self.data_table.setItem(row_idx, 4, QTableWidgetItem(format_value(temperature)))
         
         self.data_table.resizeColumnsToContents()
     
@@ -432,6 +606,17 @@ PARAMETER STATISTICS
             )
         
         self.params_canvas.draw()
+        
+        # Parameter trends chart
+        self.trend_canvas.axes.clear()
+        if self.chart:
+            for param, color in zip(['flowrate', 'pressure', 'temperature'], ['#667eea', '#764ba2', '#ed64a6']):
+                series = self.chart['series'][param]
+                self.trend_canvas.axes.plot(series['x'], series['y'], color=color, label=param.capitalize())
+            self.trend_canvas.axes.legend()
+        self.trend_canvas.axes.set_title('Parameter Trends Across Equipment')
+        self.trend_canvas.axes.set_xlabel('Row')
+        self.trend_canvas.draw()
     
     def download_pdf(self):
         if not self.selected_dataset:
@@ -458,6 +643,34 @@ PARAMETER STATISTICS
         except Exception as e:
             QMessageBox.critical(self, 'Error', str(e))
     
+    def download_all_pdfs(self):
+        if not self.datasets:
+            return
+        
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, 'Save PDF Reports', 'equipment_reports.zip', 'ZIP Archives (*.zip)'
+        )
+        if not file_path:
+            return
+        
+        try:
+            # Reports are rendered in parallel on the server and streamed as one ZIP
+            response = self.session.post(
+                f'{API_BASE_URL}/reports/batch/',
+                json={'ids': [dataset['id'] for dataset in self.datasets]},
+                stream=True
+            )
+            
+            if response.status_code == 200:
+                with open(file_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=65536):
+                        f.write(chunk)
+                QMessageBox.information(self, 'Success', 'PDF reports downloaded successfully!')
+            else:
+                QMessageBox.warning(self, 'Error', 'Failed to download PDF reports')
+        except Exception as e:
+            QMessageBox.critical(self, 'Error', str(e))
+    
     def logout(self):
         try:
             self.session.post(f'{API_BASE_URL}/auth/logout/')
@@ -26,10 +26,23 @@ ChartJS.register(
   LineElement
 );
 
+// Poll a queued PDF report once a second for up to this many seconds before
+// falling back to rendering it in the download request
+const PDF_JOB_MAX_POLLS = 60;
+
+// Rows per table page, for the bundle's first page and /rows/ alike
+const ROW_PAGE_SIZE = 100;
+
+const nextCursor = (next) => (next ? new URL(next).searchParams.get('cursor') : null);
+
 function Dashboard({ user, onLogout }) {
   const [datasets, setDatasets] = useState([]);
   const [selectedDataset, setSelectedDataset] = useState(null);
   const [summary, setSummary] = useState(null);
+  const [chart, setChart] = useState(null);
+  // Table page shown, and the cursor that loads each page visited so far
+  const [rowPage, setRowPage] = useState(null);
+  const [rowCursors, setRowCursors] = useState([]);
   const [file, setFile] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
@@ -76,12 +89,14 @@ function Dashboard({ user, onLogout }) {
     setLoading(true);
     setError('');
     try {
-      const [datasetRes, summaryRes] = await Promise.all([
-        api.getDataset(id),
-        api.getDatasetSummary(id),
-      ]);
-      setSelectedDataset(datasetRes.data);
-      setSummary(summaryRes.data);
+      const { data: bundle } = await api.getDatasetBundle(id, { limit: ROW_PAGE_SIZE });
+      // The bundle has no rows while they are still being written
+      const rows = bundle.rows || (await api.getDatasetRows(id, { limit: ROW_PAGE_SIZE })).data;
+      setSelectedDataset(bundle.dataset);
+      setRowPage({ index: 0, results: rows.results });
+      setRowCursors(rows.next ? [null, nextCursor(rows.next)] : [null]);
+      setSummary(bundle.summary);
+      setChart(bundle.chart);
       setError('');
     } catch (err) {
       console.error('Failed to load dataset:', err);
@@ -91,9 +106,30 @@ function Dashboard({ user, onLogout }) {
     }
   };
 
+  const loadRowPage = async (index) => {
+    setLoading(true);
+    try {
+      const { data: page } = await api.getDatasetRows(selectedDataset.id, {
+        limit: ROW_PAGE_SIZE,
+        cursor: rowCursors[index],
+      });
+      if (page.next && rowCursors.length === index + 1) {
+        setRowCursors([...rowCursors, nextCursor(page.next)]);
+      }
+      setRowPage({ index, results: page.results });
+    } catch (err) {
+      setError(`Failed to load rows: ${err.response?.data?.error || err.message}`);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const closeDataset = () => {
     setSelectedDataset(null);
+    setRowPage(null);
+    setRowCursors([]);
     setSummary(null);
+    setChart(null);
   };
 
   const deleteDataset = async (id, e) => {
@@ -128,7 +164,7 @@ function Dashboard({ user, onLogout }) {
     }
 
     // Validate file type
-    if (!file.name.endsWith('.csv')) {
+    if (!/\.csv(\.gz)?$/i.test(file.name)) {
       setError('Please select a valid CSV file');
       return;
     }
@@ -172,6 +208,20 @@ function Dashboard({ user, onLogout }) {
     if (!selectedDataset) return;
     
     try {
+      // Reports render in the background; poll the job, then download the finished file
+      let { data: job } = await api.createPDFJob(selectedDataset.id);
+      let polls = 0;
+      while ((job.status === 'pending' || job.status === 'running') && polls < PDF_JOB_MAX_POLLS) {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        ({ data: job } = await api.getPDFJob(selectedDataset.id, job.id));
+        polls++;
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error);
+      }
+      if (job.status !== 'done') {
+        setError('PDF report is taking too long to render in the background; rendering it directly');
+      }
       const response = await api.downloadPDF(selectedDataset.id);
       const url = window.URL.createObjectURL(new Blob([response.data]));
       const link = document.createElement('a');
@@ -243,30 +293,30 @@ function Dashboard({ user, onLogout }) {
   };
 
   const getParameterTrendChart = () => {
-    if (!selectedDataset) return null;
+    if (!chart) return null;
 
-    const equipmentNames = selectedDataset.data.map(item => item['Equipment Name']);
+    // Downsampled series: x is the row index, so each line keeps its own points
+    const points = (series) => series.x.map((x, i) => ({ x, y: series.y[i] }));
     
     return {
-      labels: equipmentNames,
       datasets: [
         {
           label: 'Flowrate',
-          data: selectedDataset.data.map(item => item.Flowrate),
+          data: points(chart.series.flowrate),
           borderColor: 'rgba(102, 126, 234, 1)',
           backgroundColor: 'rgba(102, 126, 234, 0.2)',
           tension: 0.4,
         },
         {
           label: 'Pressure',
-          data: selectedDataset.data.map(item => item.Pressure),
+          data: points(chart.series.pressure),
           borderColor: 'rgba(118, 75, 162, 1)',
           backgroundColor: 'rgba(118, 75, 162, 0.2)',
           tension: 0.4,
         },
         {
           label: 'Temperature',
-          data: selectedDataset.data.map(item => item.Temperature),
+          data: points(chart.series.temperature),
           borderColor: 'rgba(237, 100, 166, 1)',
           backgroundColor: 'rgba(237, 100, 166, 0.2)',
           tension: 0.4,
@@ -354,7 +404,7 @@ function Dashboard({ user, onLogout }) {
                 <div className="file-input-container">
                   <input
                     type="file"
-                    accept=".csv"
+                    accept=".csv,.gz"
                     onChange={(e) => setFile(e.target.files[0])}
                     id="fileInput"
                     className="file-input-hidden"
@@ -546,6 +596,10 @@ function Dashboard({ user, onLogout }) {
                   options={{ 
                     responsive: true,
                     scales: {
+                      x: {
+                        type: 'linear',
+                        title: { display: true, text: 'Row' }
+                      },
                       y: {
                         beginAtZero: true
                       }
@@ -557,9 +611,31 @@ function Dashboard({ user, onLogout }) {
           )}
 
           {/* Data Table */}
-          {selectedDataset && (
+          {selectedDataset && rowPage && (
             <div className="data-section">
               <h2>📋 Equipment Data</h2>
+              {selectedDataset.record_count > ROW_PAGE_SIZE && (
+                <div className="table-pager">
+                  <button
+                    className="btn btn-secondary"
+                    disabled={loading || rowPage.index === 0}
+                    onClick={() => loadRowPage(rowPage.index - 1)}
+                  >
+                    ← Previous
+                  </button>
+                  <span>
+                    Rows {rowPage.index * ROW_PAGE_SIZE + 1}–
+                    {rowPage.index * ROW_PAGE_SIZE + rowPage.results.length} of {selectedDataset.record_count}
+                  </span>
+                  <button
+                    className="btn btn-secondary"
+                    disabled={loading || rowCursors.length <= rowPage.index + 1}
+                    onClick={() => loadRowPage(rowPage.index + 1)}
+                  >
+                    Next →
+                  </button>
+                </div>
+              )}
               <div className="data-table">
                 <table>
                   <thead>
@@ -572,13 +648,13 @@ function Dashboard({ user, onLogout }) {
                     </tr>
                   </thead>
                   <tbody>
-                    {selectedDataset.data.map((row, index) => (
-                      <tr key={index}>
-                        <td>{row['Equipment Name']}</td>
-                        <td>{row['Type']}</td>
-                        <td>{row['Flowrate']}</td>
-                        <td>{row['Pressure']}</td>
-                        <td>{row['Temperature']}</td>
+                    {rowPage.results.map((row) => (
+                      <tr key={row.id}>
+                        <td>{row.equipment_name}</td>
+                        <td>{row.equipment_type}</td>
+                        <td>{row.flowrate}</td>
+                        <td>{row.pressure}</td>
+                        <td>{row.temperature}</td>
                       </tr>
                     ))}
                   </tbody>
@@ -2,6 +2,18 @@ import axios from 'axios';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'https://chemical-backend-1xii.onrender.com/api';
 
+// Resumable uploads are sent in chunks of this size, retrying a failed
+// chunk up to UPLOAD_RETRIES times in a row
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_RETRIES = 5;
+// A finalized upload is ingested in the background; poll it once a second
+// for up to this many seconds
+const UPLOAD_MAX_POLLS = 600;
+
+// /rows/ answers 503 until a new dataset's rows are written; retry that
+// many times, waiting as long as its Retry-After asks
+const ROWS_MAX_RETRIES = 30;
+
 // Configure axios defaults
 axios.defaults.withCredentials = true;
 
@@ -33,19 +45,68 @@ const api = {
   },
   
   // Datasets
-  uploadDataset: (formData) => {
-    // Ensure formData is FormData object
-    if (!(formData instanceof FormData)) {
-      const newFormData = new FormData();
-      newFormData.append('file', formData);
-      formData = newFormData;
+  uploadDataset: async (formData) => {
+    // Sent through a resumable upload session: a chunk that fails is
+    // retried from the offset the server reports, not from the start
+    const file = formData instanceof FormData ? formData.get('file') : formData;
+    const { data: upload } = await axios.post(`${API_BASE_URL}/uploads/`, {
+      filename: file.name,
+      size: file.size,
+    });
+    const url = `${API_BASE_URL}/uploads/${upload.id}/`;
+    
+    let offset = upload.offset;
+    let failures = 0;
+    while (offset < file.size) {
+      const end = Math.min(offset + UPLOAD_CHUNK_SIZE, file.size);
+      try {
+        ({ data: { offset } } = await axios.put(url, file.slice(offset, end), {
+          headers: {
+            'Content-Type': 'application/octet-stream',
+            'Content-Range': `bytes ${offset}-${end - 1}/${file.size}`,
+          },
+          timeout: 120000,
+        }));
+        failures = 0;
+      } catch (err) {
+        if (++failures > UPLOAD_RETRIES) {
+          // Chunks keep failing (e.g. a proxy or CORS policy rejecting the
+          // ranged PUT): drop the session and send the file in one request
+          axios.delete(url).catch(() => {});
+          return api.uploadDatasetDirect(file);
+        }
+        await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+        try {
+          ({ data: { offset } } = await axios.get(url));
+        } catch (statusErr) {
+          // Keep the last known offset and retry
+        }
+      }
     }
     
+    let { data: session } = await axios.post(`${url}finalize/`);
+    for (let polls = 0; session.status === 'ingesting'; polls++) {
+      if (polls >= UPLOAD_MAX_POLLS) {
+        throw new Error('The upload is still being processed; it will appear in the dataset list once done');
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      ({ data: session } = await axios.get(url));
+    }
+    if (session.status === 'failed') {
+      throw new Error(session.error);
+    }
+    // The new dataset, as uploadDatasetDirect returns it
+    return axios.get(`${API_BASE_URL}/datasets/${session.dataset}/`, { params: { exclude: 'data' } });
+  },
+  
+  uploadDatasetDirect: (file) => {
+    const formData = new FormData();
+    formData.append('file', file);
     return axios.post(`${API_BASE_URL}/datasets/`, formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
       },
-      timeout: 30000, // 30 second timeout
+      timeout: 120000,
     });
   },
   
@@ -61,6 +122,35 @@ const api = {
     return axios.get(`${API_BASE_URL}/datasets/${id}/summary/`);
   },
   
+  getDatasetBundle: (id, { limit } = {}) => {
+    return axios.get(`${API_BASE_URL}/datasets/${id}/bundle/`, { params: { limit } });
+  },
+  
+  // One keyset page of rows; pass the cursor from the previous page's `next` link
+  getDatasetRows: async (id, { limit, cursor } = {}) => {
+    for (let attempt = 0; ; attempt++) {
+      try {
+        return await axios.get(`${API_BASE_URL}/datasets/${id}/rows/`, {
+          params: { pagination: 'cursor', limit, cursor },
+        });
+      } catch (err) {
+        if (err.response?.status !== 503 || attempt >= ROWS_MAX_RETRIES) {
+          throw err;
+        }
+        const wait = Number(err.response.headers['retry-after']) || 2;
+        await new Promise((resolve) => setTimeout(resolve, wait * 1000));
+      }
+    }
+  },
+  
+  createPDFJob: (id) => {
+    return axios.post(`${API_BASE_URL}/datasets/${id}/pdf/jobs/`);
+  },
+  
+  getPDFJob: (id, jobId) => {
+    return axios.get(`${API_BASE_URL}/datasets/${id}/pdf/jobs/${jobId}/`);
+  },
+  
   downloadPDF: (id) => {
     return axios.get(`${API_BASE_URL}/datasets/${id}/pdf/`, {
       responseType: 'blob',